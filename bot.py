@@ -26,7 +26,10 @@ def main() -> int:
     state_store = StateStore(config.state_file)
 
     runner = BotRunner(config, messages, state_store)
-    runner.run()
+    try:
+        runner.run()
+    finally:
+        state_store.close()
     return 0
 
 
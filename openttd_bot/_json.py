@@ -0,0 +1,27 @@
+"""JSON helpers that use orjson when it is installed."""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:  # pragma: no cover - optional dependency
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def loads(payload: bytes) -> Any:
+    """Decode JSON with orjson when it is installed."""
+
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+def dumps(data: Any) -> bytes:
+    """Encode *data* as indented UTF-8 JSON, using orjson when available."""
+
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
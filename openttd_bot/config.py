@@ -6,6 +6,8 @@ from dataclasses import dataclass
 import os
 from pathlib import Path
 
+_ENV_CONFIG: "BotConfig | None" = None
+
 
 @dataclass(slots=True)
 class BotConfig:
@@ -23,8 +25,26 @@ class BotConfig:
 
     @classmethod
     def from_env(cls) -> "BotConfig":
-        """Create a configuration object from environment variables."""
+        """Create a configuration object from environment variables.
+
+        The environment is only parsed on the first call; later calls return
+        the same instance until :meth:`reset_cache` is called.
+        """
 
+        global _ENV_CONFIG
+        if _ENV_CONFIG is None:
+            _ENV_CONFIG = cls._parse_env()
+        return _ENV_CONFIG
+
+    @classmethod
+    def reset_cache(cls) -> None:
+        """Forget the cached environment configuration."""
+
+        global _ENV_CONFIG
+        _ENV_CONFIG = None
+
+    @classmethod
+    def _parse_env(cls) -> "BotConfig":
         host = os.getenv("OTTD_HOST", "127.0.0.1")
         port = int(os.getenv("OTTD_ADMIN_PORT", "3977"))
         admin_password = os.getenv("OTTD_ADMIN_PASSWORD", "")
@@ -2,42 +2,105 @@
 
 from __future__ import annotations
 
+from collections import defaultdict
+from contextlib import contextmanager
 import logging
 import time
 from types import SimpleNamespace
-from typing import Dict, Optional
+from typing import Callable, Dict, Iterator, Optional
 
 from pyopenttdadmin.enums import Actions, ChatDestTypes
 
 from .config import BotConfig
 from .messages import MessageCatalog
-from .messenger import AdminMessenger
-from .models import ClientState, CompanyState, SPECTATOR_COMPANY_ID
+from .messenger import MessengerProtocol
+from .models import ClientState, CompanyState, MAX_COMPANIES, SPECTATOR_COMPANY_ID
 from .state import StateStore
 
 LOGGER = logging.getLogger(__name__)
 
+_PASSWORD_REAPPLY_COOLDOWN_NS = 2_000_000_000
+_PASSWORD_CLEAR_KEYWORDS = frozenset({"clear", "reset", "remove", "delete", "none", "leer"})
+
+_DEFAULT_COMPANY_NAMES = tuple(f"Firma #{company_id + 1}" for company_id in range(MAX_COMPANIES))
+
+_CHAT_ACTIONS = frozenset({Actions.CHAT, Actions.CHAT_CLIENT, Actions.CHAT_COMPANY})
+_CHAT_DESTTYPES = frozenset({ChatDestTypes.BROADCAST, ChatDestTypes.CLIENT, ChatDestTypes.TEAM})
+
+# Stands in for the joining player's name in the cached join messages.
+_CLIENT_NAME_PLACEHOLDER = "\x00client_name\x00"
+_JOIN_MESSAGE_KEYS = ("welcome", "help", "rules")
+
 
 class BotCore:
     """Encapsulates all stateful behaviour of the bot."""
 
+    __slots__ = (
+        "config",
+        "messages",
+        "state_store",
+        "messenger",
+        "_command_prefix",
+        "clients",
+        "companies",
+        "_display_names",
+        "pending_resets",
+        "_company_members",
+        "server_name",
+        "_welcome_sent",
+        "_last_password_application",
+        "_outbox",
+        "_join_template",
+        "_commands",
+    )
+
     def __init__(
         self,
         config: BotConfig,
         messages: MessageCatalog,
         state_store: StateStore,
-        messenger: AdminMessenger,
+        messenger: MessengerProtocol,
     ) -> None:
         self.config = config
         self.messages = messages
         self.state_store = state_store
         self.messenger = messenger
+        self._command_prefix = config.command_prefix
         self.clients: Dict[int, ClientState] = {}
         self.companies: Dict[int, CompanyState] = {}
+        self._display_names: Dict[int, str] = {}
         self.pending_resets: Dict[int, int] = {}
+        self._company_members: Dict[int, set[int]] = defaultdict(set)
         self.server_name: Optional[str] = None
         self._welcome_sent: set[int] = set()
-        self._last_password_application: Dict[int, float] = {}
+        self._last_password_application: Dict[int, int] = {}
+        self._outbox: Optional[list[str]] = None
+        self._join_template: Optional[
+            tuple[tuple[str, Optional[str]], Optional[list[str]]]
+        ] = None
+        # All command handlers take ``(client, argument, is_private)``.
+        self._commands: Dict[str, Callable[[ClientState, str, bool], None]] = {
+            "help": lambda client, _argument, _is_private: self._send_help(client),
+            "rules": lambda client, _argument, _is_private: self._send_rules(client),
+            "pw": self._handle_password_command,
+            "reset": lambda client, _argument, _is_private: self._handle_reset_command(client),
+            "confirm": lambda client, _argument, _is_private: self._handle_confirm_command(client),
+            "newgame": lambda client, argument, _is_private: self._handle_newgame_command(
+                client, argument
+            ),
+        }
+
+    def reset_session(self) -> None:
+        """Forget everything learned from the previous admin connection."""
+
+        self.clients.clear()
+        self.companies.clear()
+        self._display_names.clear()
+        self.pending_resets.clear()
+        self._company_members.clear()
+        self._welcome_sent.clear()
+        self._last_password_application.clear()
+        self._outbox = None
 
     # ------------------------------------------------------------------
     # Event handling helpers
@@ -46,27 +109,38 @@ class BotCore:
     def on_welcome(self, packet: SimpleNamespace) -> None:
         """Remember server level metadata."""
 
-        self.server_name = getattr(packet, "server_name", None)
+        try:
+            self.server_name = packet.server_name
+        except AttributeError:
+            self.server_name = None
+        self._join_template = None
         LOGGER.info("Connected to server: %s", self.server_name)
 
     def on_client_join(self, packet: SimpleNamespace) -> None:
-        client_id = getattr(packet, "id", None)
-        if client_id is None:
+        try:
+            client_id = packet.id
+        except AttributeError:
             return
         LOGGER.info("Client %s joined", client_id)
 
     def on_client_quit(self, packet: SimpleNamespace) -> None:
-        client_id = getattr(packet, "id", None)
-        if client_id is None:
+        try:
+            client_id = packet.id
+        except AttributeError:
             return
         LOGGER.info("Client %s left", client_id)
-        self.clients.pop(client_id, None)
+        client = self.clients.pop(client_id, None)
+        if client is not None:
+            self._set_client_company(client, None)
         self.pending_resets.pop(client_id, None)
         self._welcome_sent.discard(client_id)
 
     def on_client_info(self, packet: SimpleNamespace) -> None:
-        client_id = getattr(packet, "id", None)
-        if client_id is None:
+        try:
+            client_id = packet.id
+            name = packet.name
+            company_id = self._normalise_company_id(packet.company_id)
+        except AttributeError:
             return
 
         client = self.clients.get(client_id)
@@ -74,23 +148,27 @@ class BotCore:
             client = ClientState(client_id=client_id)
             self.clients[client_id] = client
 
-        client.name = getattr(packet, "name", client.name)
-        company_id = self._normalise_company_id(getattr(packet, "company_id", None))
-        client.company_id = company_id
+        client.name = name
+        self._set_client_company(client, company_id)
 
         if client_id not in self._welcome_sent:
             self._welcome_sent.add(client_id)
             self._send_join_messages(client)
 
     def on_client_update(self, packet: SimpleNamespace) -> None:
-        client_id = getattr(packet, "id", None)
-        if client_id is None:
+        try:
+            client_id = packet.id
+            name = packet.name
+            company_id = self._normalise_company_id(packet.company_id)
+        except AttributeError:
             return
-        client = self.clients.setdefault(client_id, ClientState(client_id=client_id))
-        client.name = getattr(packet, "name", client.name)
+        client = self.clients.get(client_id)
+        if client is None:
+            client = ClientState(client_id=client_id)
+            self.clients[client_id] = client
+        client.name = name
         previous_company = client.company_id
-        company_id = self._normalise_company_id(getattr(packet, "company_id", None))
-        client.company_id = company_id
+        self._set_client_company(client, company_id)
 
         if previous_company != company_id and company_id is not None:
             LOGGER.info(
@@ -101,19 +179,24 @@ class BotCore:
             self._send_password_instructions(client)
 
     def on_company_info(self, packet: SimpleNamespace) -> None:
-        company_id = getattr(packet, "id", None)
-        if company_id is None:
+        try:
+            company_id = packet.id
+        except AttributeError:
             return
         company = self.companies.get(company_id)
         if company is None:
             company = CompanyState(company_id=company_id)
             self.companies[company_id] = company
 
-        company.name = (
+        # ``CompanyNewPacket`` only carries the id, so the remaining fields are optional.
+        name = (
             getattr(packet, "name", None)
             or company.name
             or self._default_company_name(company_id)
         )
+        if name != company.name:
+            company.name = name
+            self._display_names.pop(company_id, None)
         company.manager_name = getattr(packet, "manager_name", company.manager_name)
         passworded = bool(getattr(packet, "passworded", company.passworded))
         company.update_passworded(passworded)
@@ -122,24 +205,31 @@ class BotCore:
             self._maybe_reapply_password(company_id, reason="company_info")
 
     def on_company_update(self, packet: SimpleNamespace) -> None:
-        company_id = getattr(packet, "id", None)
-        if company_id is None:
+        try:
+            company_id = packet.id
+            name = packet.name
+            passworded = bool(packet.passworded)
+        except AttributeError:
             return
-        company = self.companies.setdefault(company_id, CompanyState(company_id=company_id))
-        name = getattr(packet, "name", None)
-        if name:
+        company = self.companies.get(company_id)
+        if company is None:
+            company = CompanyState(company_id=company_id)
+            self.companies[company_id] = company
+        if name and name != company.name:
             company.name = name
-        passworded = bool(getattr(packet, "passworded", company.passworded))
+            self._display_names.pop(company_id, None)
         company.update_passworded(passworded)
         if not passworded:
             self._maybe_reapply_password(company_id, reason="company_update")
 
     def on_company_remove(self, packet: SimpleNamespace) -> None:
-        company_id = getattr(packet, "id", None)
-        if company_id is None:
+        try:
+            company_id = packet.id
+        except AttributeError:
             return
         LOGGER.info("Company %s removed", self._display_company_id(company_id))
         self.companies.pop(company_id, None)
+        self._display_names.pop(company_id, None)
         self.state_store.clear_company_password(company_id)
         self._last_password_application.pop(company_id, None)
 
@@ -148,27 +238,32 @@ class BotCore:
     # ------------------------------------------------------------------
 
     def on_chat(self, packet: SimpleNamespace) -> None:
-        action = getattr(packet, "action", None)
-        desttype = getattr(packet, "desttype", None)
-        if action not in {Actions.CHAT, Actions.CHAT_CLIENT, Actions.CHAT_COMPANY}:
+        # Most chat lines are not commands, so test the prefix before anything else.
+        try:
+            message = packet.message.lstrip()
+        except AttributeError:
             return
-        if desttype not in {ChatDestTypes.BROADCAST, ChatDestTypes.CLIENT, ChatDestTypes.TEAM}:
+        prefix = self._command_prefix
+        if not message.startswith(prefix):
             return
 
-        raw_message = getattr(packet, "message", "")
-        message = raw_message.strip()
-        if not message.startswith(self.config.command_prefix):
+        try:
+            action = packet.action
+            desttype = packet.desttype
+            client_id = packet.id
+        except AttributeError:
             return
-
-        client_id = getattr(packet, "id", None)
-        if client_id is None:
+        if action not in _CHAT_ACTIONS:
             return
+        if desttype not in _CHAT_DESTTYPES:
+            return
+
         client = self.clients.get(client_id)
         if client is None:
             LOGGER.debug("Ignoring command from unknown client %s", client_id)
             return
 
-        command_line = message[len(self.config.command_prefix) :].strip()
+        command_line = message[len(prefix) :].strip()
         if not command_line:
             return
 
@@ -177,48 +272,95 @@ class BotCore:
         argument = parts[1].strip() if len(parts) > 1 else ""
         is_private = desttype == ChatDestTypes.CLIENT
 
-        if command == "help":
-            self._send_help(client)
-        elif command == "rules":
-            self._send_rules(client)
-        elif command == "pw":
-            self._handle_password_command(client, argument, is_private)
-        elif command == "reset":
-            self._handle_reset_command(client)
-        elif command == "confirm":
-            self._handle_confirm_command(client)
-        elif command == "newgame":
-            self._handle_newgame_command(client, argument)
-        else:
+        handler = self._commands.get(command)
+        if handler is None:
             LOGGER.debug("Unknown command %s from client %s", command, client_id)
+            return
+        with self._response(client):
+            handler(client, argument, is_private)
+
+    @contextmanager
+    def _response(self, client: ClientState) -> Iterator[list[str]]:
+        """Collect replies to *client* and send them as one batch on exit."""
+
+        outbox: list[str] = []
+        self._outbox = outbox
+        failed = True
+        try:
+            yield outbox
+            failed = False
+        finally:
+            self._outbox = None
+            # Replies queued before a handler failed are still delivered.
+            if outbox:
+                try:
+                    self.messenger.send_private_lines(client.client_id, outbox)
+                except Exception:
+                    if not failed:
+                        raise
+                    LOGGER.exception("Could not send replies to client %s", client.client_id)
+
+    def _reply(self, client: ClientState, key: str, **context: object) -> None:
+        """Send message *key* to *client*, or queue it while a response is open."""
+
+        lines = self.messages.get_lines(key, **context)
+        if not lines:
+            return
+        if self._outbox is not None:
+            self._outbox.extend(lines)
+        else:
+            self.messenger.send_private_lines(client.client_id, lines)
 
     # ------------------------------------------------------------------
     # Command implementations
     # ------------------------------------------------------------------
 
     def _send_help(self, client: ClientState) -> None:
-        lines = self.messages.get_lines("help", client_name=client.name, bot_name=self.config.bot_name)
-        if lines:
-            self.messenger.send_private_lines(client.client_id, lines)
+        self._reply(client, "help", client_name=client.name, bot_name=self.config.bot_name)
 
     def _send_rules(self, client: ClientState) -> None:
-        lines = self.messages.get_lines("rules", client_name=client.name, bot_name=self.config.bot_name)
+        self._reply(client, "rules", client_name=client.name, bot_name=self.config.bot_name)
+
+    def _send_join_messages(self, client: ClientState) -> None:
+        client_name = client.name or f"Spieler {client.client_id}"
+        template = self._join_message_template()
+        if template is None:
+            lines = self._render_join_messages(client_name)
+        else:
+            lines = [line.replace(_CLIENT_NAME_PLACEHOLDER, client_name) for line in template]
         if lines:
             self.messenger.send_private_lines(client.client_id, lines)
 
-    def _send_join_messages(self, client: ClientState) -> None:
+    def _join_message_template(self) -> Optional[list[str]]:
+        """Return the merged join lines with a client name placeholder.
+
+        ``None`` means a template formats ``client_name`` itself, so the lines
+        have to be rendered for every joining client.
+        """
+
+        cache_key = (self.config.bot_name, self.server_name)
+        if self._join_template is not None and self._join_template[0] == cache_key:
+            return self._join_template[1]
+
+        template: Optional[list[str]] = None
+        if all(
+            self.messages.substitutes_plainly(key, "client_name") for key in _JOIN_MESSAGE_KEYS
+        ):
+            template = self._render_join_messages(_CLIENT_NAME_PLACEHOLDER)
+        self._join_template = (cache_key, template)
+        return template
+
+    def _render_join_messages(self, client_name: str) -> list[str]:
         context = {
-            "client_name": client.name or f"Spieler {client.client_id}",
+            "client_name": client_name,
             "bot_name": self.config.bot_name,
             "server_name": self.server_name or "OpenTTD",
         }
         combined_lines: list[str] = []
-        for key in ("welcome", "help", "rules"):
+        for key in _JOIN_MESSAGE_KEYS:
             combined_lines.extend(self.messages.get_lines(key, **context))
 
-        blocks = [block for block in self.messages.merge_sections(combined_lines) if block]
-        if blocks:
-            self.messenger.send_private_lines(client.client_id, blocks)
+        return [line for line in self.messages.merge_sections(combined_lines) if line]
 
     def _send_password_instructions(self, client: ClientState) -> None:
         context = {
@@ -226,130 +368,90 @@ class BotCore:
             "bot_name": self.config.bot_name,
             "company_name": self._company_display_name(client.company_id),
         }
-        lines = self.messages.get_lines("password_instructions", **context)
-        if lines:
-            self.messenger.send_private_lines(client.client_id, lines)
+        self._reply(client, "password_instructions", **context)
 
     def _handle_password_command(self, client: ClientState, argument: str, is_private: bool) -> None:
         if not is_private:
-            lines = self.messages.get_lines(
-                "password_whisper_only", bot_name=self.config.bot_name
-            )
-            if lines:
-                self.messenger.send_private_lines(client.client_id, lines)
+            self._reply(client, "password_whisper_only", bot_name=self.config.bot_name)
             return
 
         if client.is_spectator or client.company_id is None:
-            lines = self.messages.get_lines("password_not_in_company")
-            if lines:
-                self.messenger.send_private_lines(client.client_id, lines)
+            self._reply(client, "password_not_in_company")
             return
 
         if not argument:
-            lines = self.messages.get_lines("password_missing_argument")
-            if lines:
-                self.messenger.send_private_lines(client.client_id, lines)
+            self._reply(client, "password_missing_argument")
             return
 
         company_id = client.company_id
         company_name = self._company_display_name(company_id)
 
-        lowered = argument.lower()
-        if lowered in {"clear", "reset", "remove", "delete", "none", "leer"}:
+        if argument.lower() in _PASSWORD_CLEAR_KEYWORDS:
             self.messenger.clear_company_password(company_id)
             self.state_store.clear_company_password(company_id)
             self._last_password_application.pop(company_id, None)
-            lines = self.messages.get_lines("password_clear_success", company_name=company_name)
-            if lines:
-                self.messenger.send_private_lines(client.client_id, lines)
+            self._reply(client, "password_clear_success", company_name=company_name)
             return
 
-        if any(ch in argument for ch in {"\n", "\r"}):
-            lines = self.messages.get_lines("password_invalid")
-            if lines:
-                self.messenger.send_private_lines(client.client_id, lines)
+        if "\n" in argument or "\r" in argument:
+            self._reply(client, "password_invalid")
             return
 
         self.state_store.set_company_password(company_id, argument)
         self._apply_company_password(company_id, argument, notify=False)
-        lines = self.messages.get_lines("password_set_success", company_name=company_name)
-        if lines:
-            self.messenger.send_private_lines(client.client_id, lines)
+        self._reply(client, "password_set_success", company_name=company_name)
 
     def _handle_reset_command(self, client: ClientState) -> None:
         if client.company_id is None:
-            lines = self.messages.get_lines("reset_not_in_company")
-            if lines:
-                self.messenger.send_private_lines(client.client_id, lines)
+            self._reply(client, "reset_not_in_company")
             return
 
         self.pending_resets[client.client_id] = client.company_id
         company_name = self._company_display_name(client.company_id)
-        lines = self.messages.get_lines("reset_prompt", company_name=company_name)
-        if lines:
-            self.messenger.send_private_lines(client.client_id, lines)
+        self._reply(client, "reset_prompt", company_name=company_name)
 
     def _handle_confirm_command(self, client: ClientState) -> None:
         pending_company = self.pending_resets.get(client.client_id)
         if pending_company is None:
-            lines = self.messages.get_lines("reset_no_pending")
-            if lines:
-                self.messenger.send_private_lines(client.client_id, lines)
+            self._reply(client, "reset_no_pending")
             return
 
         company_name = self._company_display_name(pending_company)
 
         if client.company_id == pending_company:
-            lines = self.messages.get_lines(
-                "reset_still_in_company", company_name=company_name
-            )
-            if lines:
-                self.messenger.send_private_lines(client.client_id, lines)
+            self._reply(client, "reset_still_in_company", company_name=company_name)
             return
 
         if client.company_id not in {None, pending_company}:
-            lines = self.messages.get_lines(
-                "reset_wrong_company", company_name=company_name
-            )
-            if lines:
-                self.messenger.send_private_lines(client.client_id, lines)
+            self._reply(client, "reset_wrong_company", company_name=company_name)
             self.pending_resets.pop(client.client_id, None)
             return
 
         self.pending_resets.pop(client.client_id, None)
         self.messenger.reset_company(pending_company)
-        lines = self.messages.get_lines("reset_confirmed", company_name=company_name)
-        if lines:
-            self.messenger.send_private_lines(client.client_id, lines)
+        self._reply(client, "reset_confirmed", company_name=company_name)
 
     def _handle_newgame_command(self, client: ClientState, argument: str) -> None:
         if not argument:
-            lines = self.messages.get_lines("newgame_missing_password")
-            if lines:
-                self.messenger.send_private_lines(client.client_id, lines)
+            self._reply(client, "newgame_missing_password")
             return
 
         if argument != self.config.admin_password:
-            lines = self.messages.get_lines("newgame_invalid_password")
-            if lines:
-                self.messenger.send_private_lines(client.client_id, lines)
+            self._reply(client, "newgame_invalid_password")
             return
 
         self._clear_all_company_passwords()
         self.pending_resets.clear()
         self.messenger.restart_game()
 
-        lines = self.messages.get_lines("newgame_started")
-        if lines:
-            self.messenger.send_private_lines(client.client_id, lines)
+        self._reply(client, "newgame_started")
 
     # ------------------------------------------------------------------
     # Password helpers
     # ------------------------------------------------------------------
 
     def _apply_company_password(self, company_id: int, password: str, notify: bool) -> None:
-        now = time.monotonic()
-        self._last_password_application[company_id] = now
+        self._last_password_application[company_id] = time.monotonic_ns()
         try:
             self.messenger.set_company_password(company_id, password)
         finally:
@@ -360,17 +462,16 @@ class BotCore:
             self._notify_company_members(company_id, "company_password_reapplied")
 
     def _maybe_reapply_password(self, company_id: int, reason: str) -> None:
-        password = self.state_store.get_company_password(company_id)
-        if not password:
-            return
         last = self._last_password_application.get(company_id)
-        now = time.monotonic()
-        if last is not None and now - last < 2.0:
+        if last is not None and time.monotonic_ns() - last < _PASSWORD_REAPPLY_COOLDOWN_NS:
             LOGGER.debug(
                 "Skip password reapply for company %s due to cooldown",
                 self._display_company_id(company_id),
             )
             return
+        password = self.state_store.get_company_password(company_id)
+        if not password:
+            return
         LOGGER.info(
             "Re-applying password for company %s (reason: %s)",
             self._display_company_id(company_id),
@@ -383,20 +484,22 @@ class BotCore:
         lines = self.messages.get_lines(message_key, company_name=company_name)
         if not lines:
             return
-        for client in self.clients.values():
-            if client.company_id == company_id:
-                self.messenger.send_private_lines(client.client_id, lines)
+        for client_id in tuple(self._company_members.get(company_id, ())):
+            self.messenger.send_private_lines(client_id, lines)
 
     def _clear_all_company_passwords(self) -> None:
-        stored_company_ids = [company_id for company_id, _ in self.state_store.iter_company_passwords()]
-        all_company_ids = set(stored_company_ids)
+        all_company_ids = {company_id for company_id, _ in self.state_store.iter_company_passwords()}
         all_company_ids.update(self.companies.keys())
 
-        for company_id in sorted(all_company_ids):
-            LOGGER.info(
-                "Clearing password for company %s before starting new game",
-                self._display_company_id(company_id),
-            )
+        log_clears = LOGGER.isEnabledFor(logging.INFO)
+        # Sorting only keeps the operator log readable; skip it when nothing is logged.
+        company_ids = sorted(all_company_ids) if log_clears else all_company_ids
+        for company_id in company_ids:
+            if log_clears:
+                LOGGER.info(
+                    "Clearing password for company %s before starting new game",
+                    self._display_company_id(company_id),
+                )
             self.messenger.clear_company_password(company_id)
             self._last_password_application.pop(company_id, None)
             company = self.companies.get(company_id)
@@ -419,6 +522,22 @@ class BotCore:
     # Helpers
     # ------------------------------------------------------------------
 
+    def _set_client_company(self, client: ClientState, company_id: Optional[int]) -> None:
+        """Update *client*'s company and keep the membership index in sync."""
+
+        previous = client.company_id
+        client.company_id = company_id
+        if previous == company_id:
+            return
+        if previous is not None:
+            members = self._company_members.get(previous)
+            if members is not None:
+                members.discard(client.client_id)
+                if not members:
+                    del self._company_members[previous]
+        if company_id is not None:
+            self._company_members[company_id].add(client.client_id)
+
     @staticmethod
     def _normalise_company_id(company_id: Optional[int]) -> Optional[int]:
         if company_id is None:
@@ -429,6 +548,8 @@ class BotCore:
 
     @staticmethod
     def _default_company_name(company_id: int) -> str:
+        if 0 <= company_id < MAX_COMPANIES:
+            return _DEFAULT_COMPANY_NAMES[company_id]
         return f"Firma #{company_id + 1}"
 
     @staticmethod
@@ -438,7 +559,13 @@ class BotCore:
     def _company_display_name(self, company_id: Optional[int]) -> str:
         if company_id is None:
             return "Firma"
+        cached = self._display_names.get(company_id)
+        if cached is not None:
+            return cached
         company = self.companies.get(company_id)
         if company and company.name:
-            return company.name
-        return self._default_company_name(company_id)
+            name = company.name
+        else:
+            name = self._default_company_name(company_id)
+        self._display_names[company_id] = name
+        return name
@@ -2,22 +2,33 @@
 
 from __future__ import annotations
 
-from collections import OrderedDict
-from dataclasses import dataclass
-import json
+from dataclasses import dataclass, field
+from functools import lru_cache
 import logging
 from pathlib import Path
-import re
+import string
+import sys
+from types import MappingProxyType
 from typing import Any, Iterable, Mapping
 
+from . import _json
 
 LOGGER = logging.getLogger(__name__)
 
 
-_SECTION_HEADER_RE = re.compile(r"^-+\[(?P<section>[^\]]+)\]-+$")
+_FORMATTER = string.Formatter()
 
+# Upper bound for memoised renderings; names make the key space unbounded.
+_RENDER_CACHE_SIZE = 256
+_MERGE_CACHE_SIZE = 128
 
-DEFAULT_MESSAGES: dict[str, Any] = {
+# A compiled line is either ``(line, ())`` for static text, ``(template, names)``
+# for a ``%``-style template filled positionally from the context, or
+# ``(line, None)`` for templates that still need ``str.format``.
+CompiledLine = tuple[str, "tuple[str, ...] | None"]
+
+
+DEFAULT_MESSAGES: Mapping[str, Any] = MappingProxyType({
     'welcome': ['---------------------[ENG]---------------------',
         'Welcome {client_name}!',
         'This server is maintained by {bot_name}.',
@@ -116,13 +127,39 @@ DEFAULT_MESSAGES: dict[str, Any] = {
         'Clearing all company passwords and starting a new game.',
         '---------------------[DE]---------------------',
         'Alle Firmenpasswörter werden gelöscht und ein neues Spiel wird gestartet.'],
-}
+})
 
 @dataclass(slots=True)
 class MessageCatalog:
     """Wrapper around the user configurable message catalogue."""
 
     data: Mapping[str, Any]
+    _compiled: dict[str, list[CompiledLine]] = field(init=False, repr=False, compare=False)
+    _compiled_messages: dict[tuple[str, str], CompiledLine] = field(
+        init=False, repr=False, compare=False
+    )
+    _rendered: dict[tuple[str, tuple[tuple[str, str], ...]], tuple[str, ...]] = field(
+        init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self) -> None:
+        compiled: dict[str, list[CompiledLine]] = {}
+        for key, value in self.data.items():
+            if value is None:
+                continue
+            if value is DEFAULT_MESSAGES.get(key):
+                compiled[key] = _DEFAULT_COMPILED[key]
+            elif isinstance(value, (str, list, tuple)):
+                compiled[key] = _compile_lines(value)
+            else:
+                LOGGER.warning(
+                    "Ignoring message %r: expected text or a list of lines, got %s",
+                    key,
+                    type(value).__name__,
+                )
+        self._compiled = compiled
+        self._compiled_messages = {}
+        self._rendered = {}
 
     @classmethod
     def load(cls, path: Path) -> "MessageCatalog":
@@ -130,40 +167,61 @@ class MessageCatalog:
 
         if path.exists():
             try:
-                with path.open("r", encoding="utf-8") as handle:
-                    loaded = json.load(handle)
+                loaded = _json.loads(path.read_bytes())
             except Exception as exc:  # pragma: no cover - defensive
                 LOGGER.warning("Failed to load messages.json, using defaults: %%s", exc)
                 loaded = {}
         else:
             loaded = {}
 
-        data = dict(DEFAULT_MESSAGES)
-        for key, value in loaded.items():
-            data[key] = value
-        return cls(data)
+        return cls(MappingProxyType({**DEFAULT_MESSAGES, **loaded}))
 
     def get_lines(self, key: str, **context: Any) -> list[str]:
         """Return a list of formatted message lines for *key*."""
 
-        raw = self.data.get(key)
-        if raw is None:
+        compiled = self._compiled.get(key)
+        if compiled is None:
             return []
-        if isinstance(raw, str):
-            raw_lines: Iterable[str] = [raw]
-        else:
-            raw_lines = raw
-        return [line.format(**context) for line in raw_lines]
+        # Only plain strings are cached: values that compare equal, such as
+        # ``1``, ``1.0`` and ``True``, may still render differently.
+        for value in context.values():
+            if type(value) is not str:
+                return [_render_line(template, names, context) for template, names in compiled]
+        cache_key = (key, tuple(sorted(context.items())))
+        rendered = self._rendered.get(cache_key)
+        if rendered is None:
+            rendered = tuple([_render_line(template, names, context) for template, names in compiled])
+            if len(self._rendered) >= _RENDER_CACHE_SIZE:
+                self._rendered.clear()
+            self._rendered[cache_key] = rendered
+        return list(rendered)
 
     def get_message(self, key: str, default: str = "", joiner: str = " ", **context: Any) -> str:
         """Return a single formatted message for *key*."""
 
-        raw = self.data.get(key)
-        if raw is None:
-            return default
-        if isinstance(raw, str):
-            return raw.format(**context)
-        return joiner.join(str(part) for part in raw).format(**context)
+        compiled = self._compiled_messages.get((key, joiner))
+        if compiled is None:
+            raw = self.data.get(key)
+            if raw is None:
+                return default
+            if isinstance(raw, str):
+                compiled = _compile_line(raw)
+            else:
+                compiled = _compile_line(joiner.join(str(part) for part in raw))
+            self._compiled_messages[(key, joiner)] = compiled
+        return _render_line(compiled[0], compiled[1], context)
+
+    def substitutes_plainly(self, key: str, name: str) -> bool:
+        """Return whether every ``{name}`` field in *key* is inserted verbatim.
+
+        Fields with a conversion or format spec (``{name!r}``, ``{name:>8}``)
+        depend on the value itself and cannot be patched in after rendering.
+        """
+
+        for template, names in self._compiled.get(key, ()):
+            if names is None and isinstance(template, str) and name in template:
+                return False
+        return True
 
     def has(self, key: str) -> bool:
         """Return whether a message is configured for *key*."""
@@ -173,31 +231,97 @@ class MessageCatalog:
     def merge_sections(self, lines: Iterable[str]) -> list[str]:
         """Collapse repeated language section headers while preserving order."""
 
-        blocks: "OrderedDict[str | None, list[str]]" = OrderedDict()
-        current_section: str | None = None
-
-        for line in lines:
-            stripped = line.strip()
-            header = _SECTION_HEADER_RE.match(stripped)
-            if header:
-                section = header.group("section")
-                block = blocks.setdefault(section, [])
-                if not block:
-                    block.append(line)
-                current_section = section
-                continue
+        return list(_merge_sections(tuple(lines)))
 
-            block = blocks.setdefault(current_section, [])
-            block.append(line)
 
-        merged: list[str] = []
-        for block in blocks.values():
-            trimmed = _trim_empty_edges(block)
-            if not trimmed:
-                continue
-            merged.extend(trimmed)
+@lru_cache(maxsize=_MERGE_CACHE_SIZE)
+def _merge_sections(lines: tuple[str, ...]) -> tuple[str, ...]:
+    """Merge language blocks of *lines*; memoised since join messages repeat."""
+
+    blocks: list[list[str]] = []
+    block_index: dict[str | None, int] = {}
+    current: list[str] | None = None
+
+    for line in lines:
+        section = _section_name(line.strip())
+        if section is not None:
+            index = block_index.get(section)
+            if index is None:
+                block_index[section] = len(blocks)
+                current = [line]
+                blocks.append(current)
+            else:
+                current = blocks[index]
+            continue
+
+        if current is None:
+            block_index[None] = len(blocks)
+            current = []
+            blocks.append(current)
+        current.append(line)
 
-        return merged
+    merged: list[str] = []
+    for block in blocks:
+        merged.extend(_trim_empty_edges(block))
+
+    return tuple(merged)
+
+
+def _section_name(stripped: str) -> str | None:
+    """Return ``NAME`` if *stripped* is a ``---[NAME]---`` section header."""
+
+    if not (stripped.startswith("-") and stripped.endswith("-")):
+        return None
+    inner = stripped.strip("-")
+    if len(inner) < 3 or inner[0] != "[" or inner[-1] != "]":
+        return None
+    section = inner[1:-1]
+    if "]" in section:
+        return None
+    return section
+
+
+def _compile_lines(raw: Any) -> list[CompiledLine]:
+    if isinstance(raw, str):
+        return [_compile_line(raw)]
+    return [_compile_line(line) for line in raw]
+
+
+def _compile_line(line: Any) -> CompiledLine:
+    """Parse a ``str.format`` template once so rendering skips the parser."""
+
+    if not isinstance(line, str):
+        return line, None
+    literals: list[str] = []
+    parts: list[str] = []
+    names: list[str] = []
+    try:
+        parsed = list(_FORMATTER.parse(line))
+    except ValueError:
+        # Malformed templates keep failing lazily, exactly like ``str.format``.
+        return line, None
+    for literal, field_name, format_spec, conversion in parsed:
+        literals.append(literal)
+        parts.append(literal.replace("%", "%%"))
+        if field_name is None:
+            continue
+        if not field_name.isidentifier() or format_spec or conversion:
+            return line, None
+        parts.append("%s")
+        names.append(field_name)
+    if not names:
+        # Static lines such as the ``---[ENG]---`` headers repeat across every
+        # message; interning keeps one copy per distinct line.
+        return sys.intern("".join(literals)), ()
+    return "".join(parts), tuple(names)
+
+
+def _render_line(template: str, names: tuple[str, ...] | None, context: Mapping[str, Any]) -> str:
+    if names is None:
+        return template.format(**context)
+    if not names:
+        return template
+    return template % tuple([context[name] for name in names])
 
 
 def _trim_empty_edges(lines: list[str]) -> list[str]:
@@ -210,3 +334,9 @@ def _trim_empty_edges(lines: list[str]) -> list[str]:
         end -= 1
 
     return lines[start:end]
+
+
+# Built once at import so catalogues using the defaults skip template parsing.
+_DEFAULT_COMPILED: dict[str, list[CompiledLine]] = {
+    key: _compile_lines(value) for key, value in DEFAULT_MESSAGES.items()
+}
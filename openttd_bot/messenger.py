@@ -3,33 +3,65 @@
 from __future__ import annotations
 
 import logging
-from typing import Iterable
+from typing import Iterable, Protocol
 
 from pyopenttdadmin import Admin
+from pyopenttdadmin.enums import AdminUpdateFrequency, AdminUpdateType
 
 LOGGER = logging.getLogger(__name__)
 
+# Escapes backslashes and double quotes for quoted RCON arguments in one pass.
+_RCON_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"'})
+
+
+class MessengerProtocol(Protocol):
+    """Messaging and RCON surface that :class:`~openttd_bot.core.BotCore` relies on."""
+
+    def send_private_lines(self, client_id: int, lines: Iterable[str]) -> None: ...
+
+    def set_company_password(self, company_id: int, password: str) -> None: ...
+
+    def clear_company_password(self, company_id: int) -> None: ...
+
+    def reset_company(self, company_id: int) -> None: ...
+
+    def restart_game(self) -> None: ...
+
 
 class AdminMessenger:
     """High level helper for sending messages and RCON commands."""
 
     def __init__(self, admin: Admin) -> None:
+        # Only used from the session thread, which also runs the reapply and
+        # watchdog timers, so sends never interleave and need no lock.
+        self._admin = admin
+
+    def rebind(self, admin: Admin) -> None:
+        """Send through *admin* from now on, e.g. after a reconnect."""
+
         self._admin = admin
 
     def send_private(self, client_id: int, message: str) -> None:
         if not message:
             return
-        LOGGER.debug("Sending private message to client %%s", client_id)
+        LOGGER.debug("Sending private message to client %s", client_id)
         self._admin.send_private(message, client_id)
 
     def send_private_lines(self, client_id: int, lines: Iterable[str]) -> None:
-        for line in lines:
-            self.send_private(client_id, line)
+        """Send *lines* to *client_id* back to back as one batch."""
+
+        messages = [line for line in lines if line]
+        if not messages:
+            return
+        LOGGER.debug("Sending %s private message(s) to client %s", len(messages), client_id)
+        send = self._admin.send_private
+        for message in messages:
+            send(message, client_id)
 
     def send_company(self, company_id: int, message: str) -> None:
         if not message:
             return
-        LOGGER.debug("Sending company message to %%s", company_id)
+        LOGGER.debug("Sending company message to %s", company_id)
         self._admin.send_company(message, company_id)
 
     def send_broadcast(self, message: str) -> None:
@@ -38,14 +70,26 @@ class AdminMessenger:
         LOGGER.debug("Sending broadcast message")
         self._admin.send_global(message)
 
+    def subscribe_many(
+        self, subscriptions: Iterable[tuple[AdminUpdateType, AdminUpdateFrequency]]
+    ) -> None:
+        """Send all *subscriptions* back to back as one batch."""
+
+        subscribe = self._admin.subscribe
+        for update_type, frequency in subscriptions:
+            subscribe(update_type, frequency)
+
+    def _send_rcon(self, command: str) -> None:
+        self._admin.send_rcon(command)
+
     def set_admin_name(self, name: str) -> None:
         """Update the server-side chat name used for admin messages."""
 
         if not name:
             return
-        escaped = name.replace("\\", "\\\\").replace('"', '\\"')
+        escaped = name.translate(_RCON_ESCAPES)
         LOGGER.info("Setting admin chat name to %s", name)
-        self._admin.send_rcon(f'name "{escaped}"')
+        self._send_rcon(f'name "{escaped}"')
 
     def _to_rcon_company_id(self, company_id: int) -> int:
         """Return the company identifier expected by RCON commands."""
@@ -58,27 +102,22 @@ class AdminMessenger:
     def set_company_password(self, company_id: int, password: str) -> None:
         company_number = self._to_rcon_company_id(company_id)
         LOGGER.info("Setting password for company %s (RCON id %s)", company_id + 1, company_number)
-        command = self._format_company_password_command(company_number, password)
-        self._admin.send_rcon(command)
+        escaped = password.translate(_RCON_ESCAPES)
+        self._send_rcon(f'company_pw {company_number} "{escaped}"')
 
     def clear_company_password(self, company_id: int) -> None:
         company_number = self._to_rcon_company_id(company_id)
         LOGGER.info("Clearing password for company %s (RCON id %s)", company_id + 1, company_number)
         command = f"company_pw {company_number} \"\""
-        self._admin.send_rcon(command)
+        self._send_rcon(command)
 
     def reset_company(self, company_id: int) -> None:
         company_number = self._to_rcon_company_id(company_id)
         LOGGER.info("Resetting company %s (RCON id %s)", company_id + 1, company_number)
-        self._admin.send_rcon(f"reset_company {company_number}")
+        self._send_rcon(f"reset_company {company_number}")
 
     def restart_game(self) -> None:
         """Start a fresh game on the server."""
 
         LOGGER.info("Requesting new game via RCON")
-        self._admin.send_rcon("restart")
-
-    @staticmethod
-    def _format_company_password_command(company_id: int, password: str) -> str:
-        escaped = password.replace("\\", "\\\\").replace('"', '\\"')
-        return f'company_pw {company_id} "{escaped}"'
+        self._send_rcon("restart")
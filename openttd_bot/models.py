@@ -6,6 +6,7 @@ from dataclasses import dataclass
 from typing import Optional
 
 SPECTATOR_COMPANY_ID = 255
+MAX_COMPANIES = 15
 
 
 @dataclass(slots=True)
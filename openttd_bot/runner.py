@@ -2,13 +2,17 @@
 
 from __future__ import annotations
 
+from dataclasses import dataclass, field
+from functools import partial
+import heapq
+import itertools
 import logging
 import socket
 import shutil
 import subprocess
 import threading
 import time
-from typing import Callable
+from typing import Any, Callable, Optional
 
 from pyopenttdadmin import Admin
 from pyopenttdadmin.enums import AdminUpdateFrequency, AdminUpdateType
@@ -22,6 +26,7 @@ from pyopenttdadmin.packet import (
     CompanyNewPacket,
     CompanyRemovePacket,
     CompanyUpdatePacket,
+    Packet,
     ProtocolPacket,
     ShutdownPacket,
     WelcomePacket,
@@ -37,6 +42,79 @@ LOGGER = logging.getLogger(__name__)
 
 PROTOCOL_WATCHDOG_INTERVAL_SECONDS = 10
 
+_SUBSCRIPTIONS = (
+    (AdminUpdateType.CLIENT_INFO, AdminUpdateFrequency.AUTOMATIC),
+    (AdminUpdateType.COMPANY_INFO, AdminUpdateFrequency.AUTOMATIC),
+    (AdminUpdateType.CHAT, AdminUpdateFrequency.AUTOMATIC),
+)
+
+# Probe an idle admin connection after a minute and give up after five missed
+# probes, so a silently dropped server is noticed without waiting for a write.
+_TCP_KEEPALIVE_OPTIONS = (
+    ("TCP_KEEPIDLE", 60),
+    ("TCP_KEEPINTVL", 10),
+    ("TCP_KEEPCNT", 5),
+)
+
+
+def _log_shutdown(packet: ShutdownPacket) -> None:
+    LOGGER.info("Server shutting down")
+
+
+# Packet handlers take only the packet; the runner keeps the session state.
+PacketHandler = Callable[[Any], None]
+DispatchTable = dict[type[Packet], PacketHandler]
+
+
+@dataclass(slots=True, order=True)
+class _ScheduledCall:
+    """Heap entry ordered by deadline, then by scheduling order.
+
+    Cancelling clears :attr:`callback`, so the entry is dropped when it
+    reaches the top of the heap.
+    """
+
+    deadline: float
+    sequence: int
+    callback: Optional[Callable[[], None]] = field(compare=False)
+
+
+class _Scheduler:
+    """Deadline heap for callbacks run from the admin read loop."""
+
+    __slots__ = ("_heap", "_sequence")
+
+    def __init__(self) -> None:
+        self._heap: list[_ScheduledCall] = []
+        self._sequence = itertools.count()
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> _ScheduledCall:
+        entry = _ScheduledCall(time.monotonic() + delay, next(self._sequence), callback)
+        heapq.heappush(self._heap, entry)
+        return entry
+
+    @staticmethod
+    def cancel(entry: Optional[_ScheduledCall]) -> None:
+        if entry is not None:
+            entry.callback = None
+
+    def clear(self) -> None:
+        self._heap.clear()
+
+    def run_due(self) -> None:
+        """Run every callback whose deadline has passed."""
+
+        heap = self._heap
+        now = time.monotonic()
+        while heap and heap[0].deadline <= now:
+            callback = heapq.heappop(heap).callback
+            if callback is None:
+                continue
+            try:
+                callback()
+            except Exception:  # pragma: no cover - defensive logging
+                LOGGER.exception("Scheduled callback failed")
+
 
 class InstrumentedAdmin(Admin):
     """Admin client with additional diagnostics for connection issues."""
@@ -51,10 +129,27 @@ class InstrumentedAdmin(Admin):
         except OSError:
             timeout = None
         self.socket_timeout_seconds = float(timeout or 0.5)
+        self._enable_keepalive()
         self.empty_read_count = 0
         self.protocol_received = False
         self.last_socket_error: str | None = None
         self.last_raw_bytes: bytes = b""
+        # Called whenever a read times out, so timers keep running while the
+        # client blocks inside ``recv`` or the login handshake.
+        self.idle_callback: Callable[[], None] | None = None
+        # Handlers that only need the packet, looked up once per packet type
+        # and called without the ``(admin, packet)`` adapter frame.
+        self.dispatch: DispatchTable = {}
+
+    def _enable_keepalive(self) -> None:
+        try:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            for name, value in _TCP_KEEPALIVE_OPTIONS:
+                option = getattr(socket, name, None)
+                if option is not None:
+                    self.socket.setsockopt(socket.IPPROTO_TCP, option, value)
+        except OSError as exc:  # pragma: no cover - platform specific
+            LOGGER.debug("Could not enable TCP keepalive on admin socket: %s", exc)
 
     # ------------------------------------------------------------------
 
@@ -64,6 +159,15 @@ class InstrumentedAdmin(Admin):
 
     # ------------------------------------------------------------------
 
+    def handle_packet(self, packet: Packet) -> None:
+        handler = self.dispatch.get(type(packet))
+        if handler is not None:
+            handler(packet)
+        if self.handlers:
+            super().handle_packet(packet)
+
+    # ------------------------------------------------------------------
+
     def debug_state(self) -> str:
         parts = [
             f"protocol_received={self.protocol_received}",
@@ -90,17 +194,20 @@ class InstrumentedAdmin(Admin):
     # ------------------------------------------------------------------
 
     def _recv(self, size: int) -> bytes:  # noqa: D401 - inherited docstring
+        debug = LOGGER.isEnabledFor(logging.DEBUG)
         try:
             data = self.socket.recv(size)
         except socket.timeout:
             if not self.protocol_received:
                 self.empty_read_count += 1
-                if LOGGER.isEnabledFor(logging.DEBUG):
+                if debug:
                     LOGGER.debug(
                         "Admin socket timed out waiting for %s bytes (%s consecutive empty reads)",
                         size,
                         self.empty_read_count,
                     )
+            if self.idle_callback is not None:
+                self.idle_callback()
             return b""
         except OSError as exc:
             self.last_socket_error = f"{exc.__class__.__name__}: {exc}"
@@ -116,9 +223,11 @@ class InstrumentedAdmin(Admin):
             )
             raise ConnectionAbortedError("Server closed the admin connection")
 
+        self.last_raw_bytes = data[:32]
+
         if not self.protocol_received:
             if self.empty_read_count:
-                if LOGGER.isEnabledFor(logging.DEBUG):
+                if debug:
                     LOGGER.debug(
                         "Received %s bytes after %s empty reads while waiting for protocol packet",
                         len(data),
@@ -126,17 +235,12 @@ class InstrumentedAdmin(Admin):
                     )
                 self.empty_read_count = 0
 
-            if LOGGER.isEnabledFor(logging.DEBUG):
-                self.last_raw_bytes = data[:32]
+            if debug:
                 LOGGER.debug(
                     "Received %s raw bytes from admin socket: %s",
                     len(data),
                     self.last_raw_bytes.hex(),
                 )
-            else:
-                self.last_raw_bytes = data[:32]
-        else:
-            self.last_raw_bytes = data[:32]
 
         return data
 
@@ -148,6 +252,15 @@ class BotRunner:
         self.config = config
         self.messages = messages
         self.state_store = state_store
+        self._scheduler = _Scheduler()
+        self._watchdog_call: _ScheduledCall | None = None
+        self._reapply_call: _ScheduledCall | None = None
+        self._probe_lock = threading.Lock()
+        self._admin: InstrumentedAdmin | None = None
+        # Created on the first connection and reused across reconnects.
+        self._messenger: AdminMessenger | None = None
+        self._bot: BotCore | None = None
+        self._dispatch: DispatchTable = {}
 
     def run(self) -> None:
         """Run the bot forever, reconnecting on errors."""
@@ -167,7 +280,12 @@ class BotRunner:
                 )
                 time.sleep(self.config.reconnect_delay_seconds)
             except Exception as exc:  # pragma: no cover - connection errors
-                LOGGER.exception("Connection error: %s", exc)
+                # Tracebacks only help when debugging; on a flaky link they
+                # would be formatted on every reconnect.
+                if LOGGER.isEnabledFor(logging.DEBUG):
+                    LOGGER.exception("Connection error")
+                else:
+                    LOGGER.warning("Connection error: %r", exc)
                 time.sleep(self.config.reconnect_delay_seconds)
 
     # ------------------------------------------------------------------
@@ -175,97 +293,115 @@ class BotRunner:
     def _run_session(self) -> None:
         LOGGER.info("Connecting to %s:%s", self.config.host, self.config.admin_port)
         with InstrumentedAdmin(self.config.host, self.config.admin_port) as admin:
-            messenger = AdminMessenger(admin)
-            bot = BotCore(self.config, self.messages, self.state_store, messenger)
-            protocol_event = threading.Event()
-
-            # Register packet handlers
-            admin.add_handler(ProtocolPacket)(self._handle_protocol(bot, protocol_event))
-            admin.add_handler(WelcomePacket)(self._handle_welcome(bot, messenger))
-            admin.add_handler(ClientJoinPacket)(lambda _admin, packet: bot.on_client_join(packet))
-            admin.add_handler(ClientQuitPacket)(lambda _admin, packet: bot.on_client_quit(packet))
-            admin.add_handler(ClientInfoPacket)(lambda _admin, packet: bot.on_client_info(packet))
-            admin.add_handler(ClientUpdatePacket)(lambda _admin, packet: bot.on_client_update(packet))
-            admin.add_handler(CompanyNewPacket)(lambda _admin, packet: bot.on_company_info(packet))
-            admin.add_handler(CompanyInfoPacket)(lambda _admin, packet: bot.on_company_info(packet))
-            admin.add_handler(CompanyUpdatePacket)(lambda _admin, packet: bot.on_company_update(packet))
-            admin.add_handler(CompanyRemovePacket)(lambda _admin, packet: bot.on_company_remove(packet))
-            admin.add_handler(ChatPacket)(lambda _admin, packet: bot.on_chat(packet))
-            admin.add_handler(ShutdownPacket)(lambda _admin, packet: LOGGER.info("Server shutting down"))
+            self._attach(admin)
+            admin.idle_callback = self._scheduler.run_due
+            admin.dispatch = self._dispatch
 
             LOGGER.info("Waiting for server protocol packet")
-            watchdog = threading.Thread(
-                target=self._protocol_watchdog,
-                name="protocol-watchdog",
-                args=(admin, protocol_event),
-                daemon=True,
-            )
-            watchdog.start()
+            self._arm_watchdog(admin, max(1, PROTOCOL_WATCHDOG_INTERVAL_SECONDS), -1)
 
             try:
                 self._authenticate(admin)
 
                 try:
-                    admin.run()
+                    self._serve(admin)
                 except ConnectionAbortedError:
-                    if not protocol_event.is_set():
+                    if not admin.protocol_received:
                         details = ""
-                        if hasattr(admin, "debug_state"):
-                            try:
-                                details = f" ({admin.debug_state()})"
-                            except Exception:  # pragma: no cover - defensive logging
-                                LOGGER.debug("Failed to collect admin debug state", exc_info=True)
+                        try:
+                            details = f" ({admin.debug_state()})"
+                        except Exception:  # pragma: no cover - defensive logging
+                            LOGGER.debug("Failed to collect admin debug state", exc_info=True)
                         LOGGER.error(
                             "Admin connection closed before receiving protocol packet%s", details
                         )
                     raise
             finally:
-                protocol_event.set()
-
-    # ------------------------------------------------------------------
+                admin.idle_callback = None
+                self._scheduler.clear()
+                self._watchdog_call = None
+                self._reapply_call = None
+                self._admin = None
+
+    def _attach(self, admin: InstrumentedAdmin) -> None:
+        """Point the bot at *admin*, creating it on the first connection."""
+
+        self._admin = admin
+        if self._bot is not None:
+            self._messenger.rebind(admin)
+            self._bot.reset_session()
+            return
 
-    def _handle_protocol(
-        self, bot: BotCore, protocol_event: threading.Event
-    ) -> Callable[[Admin, ProtocolPacket], None]:
-        def handler(admin: Admin, packet: ProtocolPacket) -> None:
-            LOGGER.info("Received protocol packet version %s", packet.version)
-            protocol_event.set()
-            if hasattr(admin, "mark_protocol_received"):
+        messenger = AdminMessenger(admin)
+        bot = BotCore(self.config, self.messages, self.state_store, messenger)
+        self._messenger = messenger
+        self._bot = bot
+        self._dispatch = {
+            ProtocolPacket: self._on_protocol,
+            WelcomePacket: self._on_welcome,
+            ClientJoinPacket: bot.on_client_join,
+            ClientQuitPacket: bot.on_client_quit,
+            ClientInfoPacket: bot.on_client_info,
+            ClientUpdatePacket: bot.on_client_update,
+            CompanyNewPacket: bot.on_company_info,
+            CompanyInfoPacket: bot.on_company_info,
+            CompanyUpdatePacket: bot.on_company_update,
+            CompanyRemovePacket: bot.on_company_remove,
+            ChatPacket: bot.on_chat,
+            ShutdownPacket: _log_shutdown,
+        }
+
+    def _serve(self, admin: InstrumentedAdmin) -> None:
+        """Dispatch packets until shutdown, running due timers between reads.
+
+        A handler failing on one packet is logged and the connection is kept;
+        socket errors and undecodable packets still end the session.
+        """
+
+        run_due = self._scheduler.run_due
+        while True:
+            for packet in admin.recv():
                 try:
-                    admin.mark_protocol_received()
-                except Exception:  # pragma: no cover - defensive logging
-                    LOGGER.debug("Failed to mark protocol as received", exc_info=True)
+                    admin.on_packet(packet)
+                except OSError:
+                    raise
+                except Exception:
+                    LOGGER.exception("Failed to handle %s", type(packet).__name__)
+                if isinstance(packet, ShutdownPacket):
+                    return
+            run_due()
 
-        return handler
+    # ------------------------------------------------------------------
 
-    def _handle_welcome(self, bot: BotCore, messenger: AdminMessenger) -> Callable[[Admin, WelcomePacket], None]:
-        def handler(admin: Admin, packet: WelcomePacket) -> None:
-            LOGGER.info("Logged in as %s", self.config.bot_name)
-            bot.on_welcome(packet)
-            try:
-                messenger.set_admin_name(self.config.bot_name)
-            except Exception:  # pragma: no cover - defensive logging
-                LOGGER.exception("Failed to set admin chat name")
-            admin.subscribe(AdminUpdateType.CLIENT_INFO, AdminUpdateFrequency.AUTOMATIC)
-            admin.subscribe(AdminUpdateType.COMPANY_INFO, AdminUpdateFrequency.AUTOMATIC)
-            admin.subscribe(AdminUpdateType.CHAT, AdminUpdateFrequency.AUTOMATIC)
-            self._schedule_reapply(bot)
+    def _on_protocol(self, packet: ProtocolPacket) -> None:
+        LOGGER.info("Received protocol packet version %s", packet.version)
+        self._cancel_watchdog()
+        self._admin.mark_protocol_received()
 
-        return handler
+    def _on_welcome(self, packet: WelcomePacket) -> None:
+        LOGGER.info("Logged in as %s", self.config.bot_name)
+        bot = self._bot
+        bot.on_welcome(packet)
+        messenger = self._messenger
+        try:
+            messenger.set_admin_name(self.config.bot_name)
+        except Exception:  # pragma: no cover - defensive logging
+            LOGGER.exception("Failed to set admin chat name")
+        messenger.subscribe_many(_SUBSCRIPTIONS)
+        self._schedule_reapply(bot)
 
     def _schedule_reapply(self, bot: BotCore) -> None:
+        if not self.state_store.has_company_passwords():
+            LOGGER.debug("No stored company passwords to reapply")
+            return
         delay = max(0, self.config.startup_reapply_delay_seconds)
         if delay == 0:
             bot.reapply_stored_passwords()
             return
 
-        def worker() -> None:
-            LOGGER.info("Waiting %s seconds before reapplying passwords", delay)
-            time.sleep(delay)
-            bot.reapply_stored_passwords()
-
-        thread = threading.Thread(target=worker, name="password-reapply", daemon=True)
-        thread.start()
+        self._scheduler.cancel(self._reapply_call)
+        LOGGER.info("Waiting %s seconds before reapplying passwords", delay)
+        self._reapply_call = self._scheduler.call_later(delay, bot.reapply_stored_passwords)
 
     # ------------------------------------------------------------------
 
@@ -281,36 +417,78 @@ class BotRunner:
 
     # ------------------------------------------------------------------
 
-    def _protocol_watchdog(self, admin: Admin, protocol_event: threading.Event) -> None:
-        wait_interval = max(1, PROTOCOL_WATCHDOG_INTERVAL_SECONDS)
-        waited = wait_interval
-        last_logged_empty_reads = -1
+    def _arm_watchdog(
+        self,
+        admin: InstrumentedAdmin,
+        waited: int,
+        last_logged_empty_reads: int,
+    ) -> None:
+        """Schedule the next protocol watchdog tick unless the packet arrived."""
 
-        while not protocol_event.wait(wait_interval):
-            if waited == wait_interval:
-                LOGGER.warning(
-                    "Still waiting for initial protocol packet from %s:%s after %s seconds. "
-                    "Verify that the OpenTTD server is reachable and that the admin port is enabled.",
-                    self.config.host,
-                    self.config.admin_port,
-                    waited,
-                )
-                self._log_connectivity_probe()
-            else:
-                LOGGER.debug(
-                    "Still waiting for initial protocol packet from %s:%s after %s seconds",
-                    self.config.host,
-                    self.config.admin_port,
-                    waited,
-                )
-            last_logged_empty_reads = self._log_admin_socket_state(
-                admin,
+        if admin.protocol_received:
+            return
+        self._watchdog_call = self._scheduler.call_later(
+            max(1, PROTOCOL_WATCHDOG_INTERVAL_SECONDS),
+            partial(self._watchdog_tick, admin, waited, last_logged_empty_reads),
+        )
+
+    def _cancel_watchdog(self) -> None:
+        self._scheduler.cancel(self._watchdog_call)
+        self._watchdog_call = None
+
+    def _watchdog_tick(
+        self,
+        admin: InstrumentedAdmin,
+        waited: int,
+        last_logged_empty_reads: int,
+    ) -> None:
+        if admin.protocol_received:
+            return
+
+        wait_interval = max(1, PROTOCOL_WATCHDOG_INTERVAL_SECONDS)
+        if waited == wait_interval:
+            LOGGER.warning(
+                "Still waiting for initial protocol packet from %s:%s after %s seconds. "
+                "Verify that the OpenTTD server is reachable and that the admin port is enabled.",
+                self.config.host,
+                self.config.admin_port,
+                waited,
+            )
+            self._log_connectivity_probe()
+        else:
+            LOGGER.debug(
+                "Still waiting for initial protocol packet from %s:%s after %s seconds",
+                self.config.host,
+                self.config.admin_port,
                 waited,
-                last_logged_empty_reads,
             )
-            waited += wait_interval
+        last_logged_empty_reads = self._log_admin_socket_state(
+            admin,
+            waited,
+            last_logged_empty_reads,
+        )
+        # Every later tick only logs at DEBUG, so stop after the first warning
+        # unless those messages would actually be emitted.
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            self._arm_watchdog(admin, waited + wait_interval, last_logged_empty_reads)
 
     def _log_connectivity_probe(self) -> None:
+        """Start a netcat probe in the background unless one is still running."""
+
+        if not self._probe_lock.acquire(blocking=False):
+            LOGGER.debug("Skipping netcat connectivity probe because one is already running")
+            return
+
+        def worker() -> None:
+            try:
+                self._run_connectivity_probe()
+            finally:
+                self._probe_lock.release()
+
+        thread = threading.Thread(target=worker, name="connectivity-probe", daemon=True)
+        thread.start()
+
+    def _run_connectivity_probe(self) -> None:
         """Run a short netcat probe to help diagnose connectivity issues."""
 
         if shutil.which("nc") is None:
@@ -343,35 +521,34 @@ class BotRunner:
 
     def _log_admin_socket_state(
         self,
-        admin: Admin,
+        admin: InstrumentedAdmin,
         waited_seconds: int,
         last_logged_empty_reads: int,
     ) -> int:
         """Log diagnostic information about the admin socket state."""
 
-        empty_reads = getattr(admin, "empty_read_count", None)
+        empty_reads = admin.empty_read_count
 
-        if empty_reads is not None:
-            if last_logged_empty_reads == -1:
-                if empty_reads:
-                    LOGGER.warning(
-                        "No data received from admin port after %s seconds (%s consecutive empty reads)",
-                        waited_seconds,
-                        empty_reads,
-                    )
-                else:
-                    LOGGER.debug(
-                        "Admin socket reported no empty reads after %s seconds", waited_seconds
-                    )
-            elif empty_reads != last_logged_empty_reads:
+        if last_logged_empty_reads == -1:
+            if empty_reads:
+                LOGGER.warning(
+                    "No data received from admin port after %s seconds (%s consecutive empty reads)",
+                    waited_seconds,
+                    empty_reads,
+                )
+            else:
                 LOGGER.debug(
-                    "Still waiting for protocol packet: %s consecutive empty reads observed", empty_reads
+                    "Admin socket reported no empty reads after %s seconds", waited_seconds
                 )
+        elif empty_reads != last_logged_empty_reads:
+            LOGGER.debug(
+                "Still waiting for protocol packet: %s consecutive empty reads observed", empty_reads
+            )
 
-        if last_logged_empty_reads == -1 and hasattr(admin, "debug_state"):
+        if last_logged_empty_reads == -1 and LOGGER.isEnabledFor(logging.DEBUG):
             try:
                 LOGGER.debug("Admin socket debug snapshot: %s", admin.debug_state())
             except Exception:  # pragma: no cover - defensive logging
                 LOGGER.debug("Failed to capture admin socket debug state", exc_info=True)
 
-        return empty_reads if empty_reads is not None else last_logged_empty_reads
+        return empty_reads
@@ -2,76 +2,197 @@
 
 from __future__ import annotations
 
+import atexit
 from dataclasses import dataclass, field
-import json
 import logging
+import os
 from pathlib import Path
-from threading import Lock
-from typing import Dict, Iterator
+from threading import Lock, Timer
+from types import MappingProxyType
+from typing import Dict, Iterator, Mapping
+import weakref
+
+from . import _json
 
 LOGGER = logging.getLogger(__name__)
 
+DEFAULT_FLUSH_DELAY_SECONDS = 0.2
+# Failed writes are retried after this delay, doubling per consecutive failure
+# up to the maximum, so a full or read-only disk is not hammered.
+_FLUSH_RETRY_SECONDS = 1.0
+_FLUSH_RETRY_MAX_SECONDS = 300.0
+
+# Stores with possibly pending changes; flushed once at interpreter exit.
+_OPEN_STORES: "weakref.WeakSet[StateStore]" = weakref.WeakSet()
+
 
 @dataclass(slots=True)
 class PersistentState:
     """Container for the on-disk state."""
 
-    companies: Dict[str, str] = field(default_factory=dict)
+    companies: Dict[int, str] = field(default_factory=dict)
 
 
 class StateStore:
-    """Manage persisted state on disk."""
+    """Manage persisted state on disk.
+
+    The file is read once on start-up; lookups are served from memory. Changes
+    are written back by a background timer at most once per
+    *flush_delay_seconds*, so bursts of updates cost a single write. Pending
+    changes are flushed by :meth:`close` and at interpreter exit.
 
-    def __init__(self, path: Path) -> None:
+    Writers replace the companies dict wholesale under ``_lock`` and publish a
+    read-only view of it, so readers never take the lock.
+    """
+
+    def __init__(self, path: Path, flush_delay_seconds: float = DEFAULT_FLUSH_DELAY_SECONDS) -> None:
         self.path = path
+        self.flush_delay_seconds = flush_delay_seconds
         self._lock = Lock()
+        self._write_lock = Lock()
         self._state = PersistentState()
+        self._dirty = False
+        self._flush_timer: Timer | None = None
+        self._flush_failures = 0
         self._load()
+        self._snapshot: Mapping[int, str] = MappingProxyType(self._state.companies)
+        _OPEN_STORES.add(self)
 
     def _load(self) -> None:
         if not self.path.exists():
             return
         try:
-            with self.path.open("r", encoding="utf-8") as handle:
-                data = json.load(handle)
+            data = _json.loads(self.path.read_bytes())
         except Exception as exc:  # pragma: no cover - defensive
             LOGGER.warning("Could not read state file %s: %s", self.path, exc)
             return
         companies = data.get("companies", {})
-        if isinstance(companies, dict):
-            self._state.companies = {
-                str(company_id): str(password)
-                for company_id, password in companies.items()
-                if password is not None
-            }
-
-    def _write(self) -> None:
+        if not isinstance(companies, dict):
+            return
+        loaded: Dict[int, str] = {}
+        for company_id, password in companies.items():
+            if password is None:
+                continue
+            try:
+                loaded[int(company_id)] = str(password)
+            except ValueError:
+                LOGGER.warning("Ignoring invalid company id %r in state file %s", company_id, self.path)
+        self._state.companies = loaded
+
+    def _write(self, companies: Dict[int, str]) -> None:
         self.path.parent.mkdir(parents=True, exist_ok=True)
         tmp_path = self.path.with_suffix(".tmp")
-        with tmp_path.open("w", encoding="utf-8") as handle:
-            json.dump({"companies": self._state.companies}, handle, indent=2, ensure_ascii=False)
-        tmp_path.replace(self.path)
+        # JSON object keys are strings; ids are only stringified on the way out.
+        payload = {"companies": {str(company_id): password for company_id, password in companies.items()}}
+        data = _json.dumps(payload)
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            view = memoryview(data)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+            _sync_data(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, self.path)
+        _sync_directory(self.path.parent)
+
+    def _publish(self, companies: Dict[int, str]) -> None:
+        """Swap in *companies* as the current state; caller holds ``_lock``."""
+
+        self._state.companies = companies
+        self._snapshot = MappingProxyType(companies)
+        self._dirty = True
+
+    def _schedule_flush(self) -> None:
+        """Arrange for pending changes to reach the disk."""
+
+        if self.flush_delay_seconds <= 0:
+            self.flush()
+            return
+        self._arm_flush_timer(self.flush_delay_seconds)
+
+    def _arm_flush_timer(self, delay: float) -> None:
+        with self._lock:
+            if self._flush_timer is not None or not self._dirty:
+                return
+            timer = Timer(delay, self.flush)
+            timer.name = "state-flush"
+            timer.daemon = True
+            self._flush_timer = timer
+        try:
+            timer.start()
+        except RuntimeError:  # pragma: no cover - interpreter shutting down
+            with self._lock:
+                if self._flush_timer is timer:
+                    self._flush_timer = None
+
+    def flush(self, *, retry: bool = True) -> None:
+        """Write pending changes to disk immediately.
+
+        A failed write is retried in the background with exponential backoff
+        unless *retry* is false.
+        """
+
+        with self._write_lock:
+            with self._lock:
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel()
+                    self._flush_timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                # Published dicts are never mutated, so no copy is needed.
+                companies = self._state.companies
+            try:
+                self._write(companies)
+            except OSError as exc:
+                self._flush_failures += 1
+                LOGGER.error(
+                    "Could not write state file %s (attempt %s): %s",
+                    self.path,
+                    self._flush_failures,
+                    exc,
+                )
+                with self._lock:
+                    self._dirty = True
+                if retry:
+                    backoff = 2 ** min(self._flush_failures - 1, 16)
+                    delay = max(self.flush_delay_seconds, _FLUSH_RETRY_SECONDS) * backoff
+                    self._arm_flush_timer(min(delay, _FLUSH_RETRY_MAX_SECONDS))
+            else:
+                self._flush_failures = 0
+
+    def close(self) -> None:
+        """Flush pending changes once and stop all further background flushing."""
+
+        self.flush(retry=False)
+        _OPEN_STORES.discard(self)
 
     def get_company_password(self, company_id: int) -> str | None:
         """Return the stored password for *company_id* if present."""
 
-        with self._lock:
-            return self._state.companies.get(str(company_id))
+        return self._snapshot.get(company_id)
 
     def set_company_password(self, company_id: int, password: str) -> None:
         """Persist the password for *company_id*."""
 
         with self._lock:
-            self._state.companies[str(company_id)] = password
-            self._write()
+            companies = dict(self._state.companies)
+            companies[company_id] = password
+            self._publish(companies)
+        self._schedule_flush()
 
     def clear_company_password(self, company_id: int) -> None:
         """Remove any stored password for *company_id*."""
 
         with self._lock:
-            if str(company_id) in self._state.companies:
-                del self._state.companies[str(company_id)]
-                self._write()
+            if company_id not in self._state.companies:
+                return
+            companies = dict(self._state.companies)
+            del companies[company_id]
+            self._publish(companies)
+        self._schedule_flush()
 
     def clear_all_company_passwords(self) -> None:
         """Remove all stored company passwords."""
@@ -79,12 +200,45 @@ class StateStore:
         with self._lock:
             if not self._state.companies:
                 return
-            self._state.companies.clear()
-            self._write()
+            self._publish({})
+        self._schedule_flush()
+
+    def has_company_passwords(self) -> bool:
+        """Return ``True`` if at least one company password is stored."""
+
+        return bool(self._snapshot)
 
     def iter_company_passwords(self) -> Iterator[tuple[int, str]]:
-        """Yield all stored company passwords."""
+        """Return an iterator over a snapshot of all stored company passwords."""
 
-        with self._lock:
-            for company_id, password in self._state.companies.items():
-                yield int(company_id), password
+        return iter(list(self._snapshot.items()))
+
+
+@atexit.register
+def _flush_open_stores() -> None:
+    for store in list(_OPEN_STORES):
+        store.flush(retry=False)
+
+
+def _sync_data(fd: int) -> None:
+    """Flush file contents to stable storage, skipping metadata when possible."""
+
+    if hasattr(os, "fdatasync"):
+        os.fdatasync(fd)
+    else:  # pragma: no cover - platform specific
+        os.fsync(fd)
+
+
+def _sync_directory(path: Path) -> None:
+    """Persist a rename in *path*; a no-op where directories cannot be opened."""
+
+    if not hasattr(os, "O_DIRECTORY"):  # pragma: no cover - platform specific
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:  # pragma: no cover - defensive
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
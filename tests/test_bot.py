@@ -1,7 +1,9 @@
 from __future__ import annotations
 
-from types import SimpleNamespace
-from typing import List, Tuple
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from itertools import islice
+from typing import DefaultDict, Deque, Iterable, List, Tuple
 
 import pytest
 
@@ -13,19 +15,25 @@ from openttd_bot.state import StateStore
 from pyopenttdadmin.enums import Actions, ChatDestTypes
 
 
+_BOT_NAME = "ServerBot"
+
+
 class FakeMessenger:
     def __init__(self) -> None:
-        self.private_messages: List[Tuple[int, str]] = []
-        self.company_messages: List[Tuple[int, str]] = []
-        self.broadcasts: List[str] = []
-        self.commands: List[Tuple[str, int, str | None]] = []
+        self.private_messages: Deque[Tuple[int, str]] = deque()
+        self.company_messages: Deque[Tuple[int, str]] = deque()
+        self.broadcasts: Deque[str] = deque()
+        self.commands: Deque[Tuple[str, int, str | None]] = deque()
+        self.commands_by_kind: DefaultDict[str, List[Tuple[int | None, str | None]]] = (
+            defaultdict(list)
+        )
+        self._tail_mark = 0
 
     def send_private(self, client_id: int, message: str) -> None:
         self.private_messages.append((client_id, message))
 
-    def send_private_lines(self, client_id: int, lines) -> None:
-        for line in lines:
-            self.send_private(client_id, line)
+    def send_private_lines(self, client_id: int, lines: Iterable[str]) -> None:
+        self.private_messages.extend((client_id, line) for line in lines)
 
     def send_company(self, company_id: int, message: str) -> None:
         self.company_messages.append((company_id, message))
@@ -34,62 +42,178 @@ class FakeMessenger:
         self.broadcasts.append(message)
 
     def set_company_password(self, company_id: int, password: str) -> None:
-        self.commands.append(("set_pw", company_id, password))
+        self._record("set_pw", company_id, password)
 
     def clear_company_password(self, company_id: int) -> None:
-        self.commands.append(("clear_pw", company_id, None))
+        self._record("clear_pw", company_id, None)
 
     def reset_company(self, company_id: int) -> None:
-        self.commands.append(("reset", company_id, None))
+        self._record("reset", company_id, None)
 
     def restart_game(self) -> None:
-        self.commands.append(("restart", None, None))
+        self._record("restart", None, None)
+
+    def _record(self, kind: str, company_id: int | None, value: str | None) -> None:
+        self.commands.append((kind, company_id, value))
+        self.commands_by_kind[kind].append((company_id, value))
+
+    def checkpoint(self) -> None:
+        self._tail_mark = len(self.private_messages)
+
+    def tail(self) -> Tuple[Tuple[int, str], ...]:
+        return tuple(islice(self.private_messages, self._tail_mark, None))
 
     def reset_messages(self) -> None:
-        self.private_messages.clear()
-        self.company_messages.clear()
-        self.broadcasts.clear()
-        self.commands.clear()
+        self.private_messages = deque()
+        self.company_messages = deque()
+        self.broadcasts = deque()
+        self.commands = deque()
+        self.commands_by_kind = defaultdict(list)
+        self._tail_mark = 0
 
 
-@pytest.fixture
-def bot(tmp_path):
+@pytest.fixture(scope="module")
+def bot_env(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp("bot")
     config = BotConfig(
         host="localhost",
         admin_port=3977,
         admin_password="admin",
-        bot_name="ServerBot",
+        bot_name=_BOT_NAME,
         command_prefix="!",
         state_file=tmp_path / "state.json",
         messages_file=tmp_path / "messages.json",
         startup_reapply_delay_seconds=0,
         reconnect_delay_seconds=5,
     )
-    messages = MessageCatalog(dict(DEFAULT_MESSAGES))
+    messages = _CATALOG
     state_store = StateStore(config.state_file)
+    yield config, messages, state_store
+    state_store.close()
+
+
+@pytest.fixture(autouse=True)
+def _clean_state(bot_env):
+    bot_env[2].clear_all_company_passwords()
+
+
+@pytest.fixture
+def bot(bot_env):
+    config, messages, state_store = bot_env
     messenger = FakeMessenger()
-    core = BotCore(config, messages, state_store, messenger)  # type: ignore[arg-type]
+    core = BotCore(config, messages, state_store, messenger)
     return core, messenger, state_store
 
 
-def make_chat(client_id: int, message: str, dest: ChatDestTypes = ChatDestTypes.BROADCAST):
-    return SimpleNamespace(
-        action=Actions.CHAT if dest != ChatDestTypes.CLIENT else Actions.CHAT_CLIENT,
+@dataclass(slots=True, frozen=True)
+class _Welcome:
+    server_name: str
+
+
+@dataclass(slots=True, frozen=True)
+class _ClientInfo:
+    id: int
+    name: str
+    company_id: int
+
+
+@dataclass(slots=True, frozen=True)
+class _ClientQuit:
+    id: int
+
+
+@dataclass(slots=True, frozen=True)
+class _CompanyInfo:
+    id: int
+    name: str
+    manager_name: str
+    passworded: bool
+
+
+@dataclass(slots=True, frozen=True)
+class _CompanyUpdate:
+    id: int
+    name: str
+    passworded: bool
+
+
+@dataclass(slots=True, frozen=True)
+class _Chat:
+    action: Actions
+    desttype: ChatDestTypes
+    id: int
+    message: str
+    money: int = 0
+
+
+_ACTION_BY_DEST = {ChatDestTypes.CLIENT: Actions.CHAT_CLIENT}
+
+
+def make_chat(client_id: int, message: str, dest: ChatDestTypes = ChatDestTypes.BROADCAST) -> _Chat:
+    return _Chat(
+        action=_ACTION_BY_DEST.get(dest, Actions.CHAT),
         desttype=dest,
         id=client_id,
         message=message,
-        money=0,
     )
 
 
-def test_merge_sections_combines_language_blocks():
-    catalog = MessageCatalog(dict(DEFAULT_MESSAGES))
-    lines = []
-    lines.extend(catalog.get_lines("welcome", client_name="Alice", bot_name="ServerBot"))
-    lines.extend(catalog.get_lines("help", bot_name="ServerBot"))
-    lines.extend(catalog.get_lines("rules"))
+_CATALOG = MessageCatalog(DEFAULT_MESSAGES)
+
+
+def _addressed(client_id: int, lines: Iterable[str]) -> Tuple[Tuple[int, str], ...]:
+    return tuple((client_id, line) for line in lines)
+
+
+_WELCOME = tuple(_CATALOG.get_lines("welcome", client_name="Alice", bot_name=_BOT_NAME))
+_HELP = tuple(_CATALOG.get_lines("help", bot_name=_BOT_NAME))
+_RULES = tuple(_CATALOG.get_lines("rules"))
+
+_EXPECTED_JOIN = _addressed(1, _CATALOG.merge_sections([*_WELCOME, *_HELP, *_RULES]))
+_EXPECTED_HELP = _addressed(1, _HELP)
+_EXPECTED_RESET_PROMPT = _addressed(9, _CATALOG.get_lines("reset_prompt", company_name="Firma 6"))
+_EXPECTED_RESET_CONFIRMED = _addressed(
+    9, _CATALOG.get_lines("reset_confirmed", company_name="Firma 6")
+)
+_EXPECTED_WHISPER_ONLY = _addressed(
+    5, _CATALOG.get_lines("password_whisper_only", bot_name=_BOT_NAME)
+)
+_EXPECTED_PASSWORD_SET = _addressed(
+    7, _CATALOG.get_lines("password_set_success", company_name="Firma 2")
+)
+_EXPECTED_PASSWORD_CLEARED = _addressed(
+    8, _CATALOG.get_lines("password_clear_success", company_name="Firma 4")
+)
+_EXPECTED_RESET_STILL_IN_COMPANY = _addressed(
+    11, _CATALOG.get_lines("reset_still_in_company", company_name="Firma 10")
+)
+_EXPECTED_RESET_WRONG_COMPANY = _addressed(
+    12, _CATALOG.get_lines("reset_wrong_company", company_name="Firma 20")
+)
+_EXPECTED_PASSWORD_REAPPLIED = _addressed(
+    13, _CATALOG.get_lines("company_password_reapplied", company_name="Firma 12")
+)
+_EXPECTED_NEWGAME_MISSING = _addressed(30, _CATALOG.get_lines("newgame_missing_password"))
+_EXPECTED_NEWGAME_INVALID = _addressed(30, _CATALOG.get_lines("newgame_invalid_password"))
+_EXPECTED_NEWGAME_STARTED = _addressed(31, _CATALOG.get_lines("newgame_started"))
+
+
+def test_merge_sections_returns_independent_lists():
+    lines = ["---[ENG]---", "Hello", "---[DE]---", "Hallo", "---[ENG]---", "Bye"]
+    first = _CATALOG.merge_sections(lines)
+    first.append("mutated")
+
+    assert _CATALOG.merge_sections(iter(lines)) == [
+        "---[ENG]---",
+        "Hello",
+        "Bye",
+        "---[DE]---",
+        "Hallo",
+    ]
 
-    merged = catalog.merge_sections(lines)
+
+def test_merge_sections_combines_language_blocks():
+    merged = _CATALOG.merge_sections([*_WELCOME, *_HELP, *_RULES])
 
     assert merged.count("---------------------[ENG]---------------------") == 1
     assert merged.count("---------------------[DE]---------------------") == 1
@@ -106,162 +230,252 @@ def test_merge_sections_combines_language_blocks():
     assert "Verfügbare Befehle" in de_block
 
 
+def test_get_lines_matches_str_format():
+    templates = [
+        "Hello {client_name}, 100% sure.",
+        "Literal {{braces}} stay.",
+        "{bot_name:>3} padded",
+        "Plain line",
+    ]
+    catalog = MessageCatalog({"custom": templates})
+    context = {"client_name": "Alice", "bot_name": "Bot"}
+
+    assert catalog.get_lines("custom", **context) == [line.format(**context) for line in templates]
+    with pytest.raises(KeyError):
+        catalog.get_lines("custom", bot_name="Bot")
+    assert catalog.get_message("custom", joiner=" | ", **context) == " | ".join(templates).format(
+        **context
+    )
+    assert catalog.get_message("missing", default="-") == "-"
+
+
+def test_get_lines_returns_fresh_lists_for_cached_renderings():
+    catalog = MessageCatalog({"greeting": ["Hi {client_name}", "Bye"]})
+
+    first = catalog.get_lines("greeting", client_name="Alice")
+    first.append("mutated")
+    assert catalog.get_lines("greeting", client_name="Alice") == ["Hi Alice", "Bye"]
+    assert catalog.get_lines("greeting", client_name="Bob") == ["Hi Bob", "Bye"]
+    assert catalog.get_lines("greeting", client_name=["unhashable"]) == ["Hi ['unhashable']", "Bye"]
+
+
+def test_get_lines_does_not_mix_up_equal_context_values():
+    catalog = MessageCatalog({"value": ["v={x}"]})
+
+    assert catalog.get_lines("value", x=1) == ["v=1"]
+    assert catalog.get_lines("value", x=True) == ["v=True"]
+    assert catalog.get_lines("value", x=1.0) == ["v=1.0"]
+    assert catalog.get_lines("value", x="1") == ["v=1"]
+
+
+def test_load_ignores_scalar_message_values(tmp_path):
+    path = tmp_path / "messages.json"
+    path.write_text('{"max_clients": 5, "strict": true, "rules": ["Be nice"]}', encoding="utf-8")
+
+    catalog = MessageCatalog.load(path)
+
+    assert catalog.get_lines("max_clients") == []
+    assert catalog.get_lines("strict") == []
+    assert catalog.get_lines("rules") == ["Be nice"]
+    assert catalog.get_lines("help", bot_name=_BOT_NAME) == list(_HELP)
+
+
 def test_join_sends_welcome_help_and_rules(bot):
     core, messenger, _ = bot
-    core.on_welcome(SimpleNamespace(server_name="TestServer"))
-    core.on_client_info(SimpleNamespace(id=1, name="Alice", company_id=SPECTATOR_COMPANY_ID))
-    bot_name = core.config.bot_name
-    expected_lines = []
-    expected_lines.extend(
-        core.messages.get_lines("welcome", client_name="Alice", bot_name=bot_name)
+    core.on_welcome(_Welcome(server_name="TestServer"))
+    core.on_client_info(_ClientInfo(id=1, name="Alice", company_id=SPECTATOR_COMPANY_ID))
+    assert tuple(messenger.private_messages)[: len(_EXPECTED_JOIN)] == _EXPECTED_JOIN
+
+
+def test_join_messages_use_each_client_name(bot):
+    core, messenger, _ = bot
+    core.on_welcome(_Welcome(server_name="TestServer"))
+    core.on_client_info(_ClientInfo(id=1, name="Alice", company_id=SPECTATOR_COMPANY_ID))
+    core.on_client_info(_ClientInfo(id=2, name="", company_id=SPECTATOR_COMPANY_ID))
+
+    alice = [message for client_id, message in messenger.private_messages if client_id == 1]
+    second = [message for client_id, message in messenger.private_messages if client_id == 2]
+    assert "Welcome Alice!" in alice
+    assert "Welcome Spieler 2!" in second
+    assert len(alice) == len(second)
+
+
+def test_join_messages_honour_client_name_format_specs(bot_env):
+    config, _, state_store = bot_env
+    catalog = MessageCatalog(
+        {**DEFAULT_MESSAGES, "welcome": ["Name={client_name!r}", "Hi {client_name:>8}|"]}
     )
-    expected_lines.extend(core.messages.get_lines("help", bot_name=bot_name))
-    expected_lines.extend(core.messages.get_lines("rules"))
-    expected_blocks = core.messages.merge_sections(expected_lines)
-    expected = [(1, block) for block in expected_blocks]
-    assert messenger.private_messages[: len(expected)] == expected
+    messenger = FakeMessenger()
+    core = BotCore(config, catalog, state_store, messenger)
+    core.on_client_info(_ClientInfo(id=1, name="Al", company_id=SPECTATOR_COMPANY_ID))
+    core.on_client_info(_ClientInfo(id=2, name="Bea", company_id=SPECTATOR_COMPANY_ID))
+
+    sent = tuple(messenger.private_messages)
+    assert sent[:2] == ((1, "Name='Al'"), (1, "Hi       Al|"))
+    assert (2, "Name='Bea'") in sent
+    assert (2, "Hi      Bea|") in sent
 
 
 def test_help_command_sends_help(bot):
     core, messenger, _ = bot
-    core.on_client_info(SimpleNamespace(id=1, name="Alice", company_id=SPECTATOR_COMPANY_ID))
+    core.on_client_info(_ClientInfo(id=1, name="Alice", company_id=SPECTATOR_COMPANY_ID))
     messenger.reset_messages()
     core.on_chat(make_chat(1, "!help"))
-    bot_name = core.config.bot_name
-    expected = [
-        (1, line) for line in core.messages.get_lines("help", bot_name=bot_name)
-    ]
-    assert messenger.private_messages == expected
+    assert tuple(messenger.private_messages) == _EXPECTED_HELP
 
 
-def test_password_requires_private(bot):
-    core, messenger, state_store = bot
-    core.on_company_info(SimpleNamespace(id=3, name="Firma 3", manager_name="", passworded=False))
-    core.on_client_info(SimpleNamespace(id=5, name="Bob", company_id=3))
-    messenger.reset_messages()
-    core.on_chat(make_chat(5, "!pw geheim", ChatDestTypes.BROADCAST))
-    bot_name = core.config.bot_name
-    expected = [
-        (5, line)
-        for line in core.messages.get_lines(
-            "password_whisper_only", bot_name=bot_name
-        )
-    ]
-    assert messenger.private_messages == expected
-    assert state_store.get_company_password(3) is None
-    assert messenger.commands == []
-
-
-def test_password_private_sets_and_persists(bot):
-    core, messenger, state_store = bot
-    core.on_company_info(SimpleNamespace(id=2, name="Firma 2", manager_name="", passworded=False))
-    core.on_client_info(SimpleNamespace(id=7, name="Cara", company_id=2))
+def test_replies_queued_before_a_handler_error_are_sent(bot):
+    core, messenger, _ = bot
+    core.on_client_info(_ClientInfo(id=1, name="Alice", company_id=SPECTATOR_COMPANY_ID))
     messenger.reset_messages()
-    core.on_chat(make_chat(7, "!pw geheim", ChatDestTypes.CLIENT))
-    assert state_store.get_company_password(2) == "geheim"
-    assert ("set_pw", 2, "geheim") in messenger.commands
-    expected = [
-        (7, line)
-        for line in core.messages.get_lines(
-            "password_set_success", company_name="Firma 2"
-        )
-    ]
-    assert messenger.private_messages[-len(expected) :] == expected
-
 
-def test_password_clear(bot):
+    def failing_help(client, _argument, _is_private):
+        core._send_help(client)
+        raise RuntimeError("rcon failed")
+
+    core._commands["help"] = failing_help
+    with pytest.raises(RuntimeError):
+        core.on_chat(make_chat(1, "!help"))
+
+    assert tuple(messenger.private_messages) == _EXPECTED_HELP
+
+
+@pytest.mark.parametrize(
+    ("company_id", "client_id", "stored", "message", "dest", "password", "commands", "replies"),
+    [
+        pytest.param(
+            3, 5, None, "!pw geheim", ChatDestTypes.BROADCAST, None, (), _EXPECTED_WHISPER_ONLY,
+            id="requires-private",
+        ),
+        pytest.param(
+            2, 7, None, "!pw geheim", ChatDestTypes.CLIENT, "geheim",
+            (("set_pw", 2, "geheim"),), _EXPECTED_PASSWORD_SET,
+            id="sets-and-persists",
+        ),
+        pytest.param(
+            4, 8, "alt", "!pw clear", ChatDestTypes.CLIENT, None,
+            (("clear_pw", 4, None),), _EXPECTED_PASSWORD_CLEARED,
+            id="clear",
+        ),
+    ],
+)
+def test_password_command(
+    bot, company_id, client_id, stored, message, dest, password, commands, replies
+):
     core, messenger, state_store = bot
-    core.on_company_info(SimpleNamespace(id=4, name="Firma 4", manager_name="", passworded=True))
-    core.on_client_info(SimpleNamespace(id=8, name="Dora", company_id=4))
-    state_store.set_company_password(4, "alt")
+    name = f"Firma {company_id}"
+    core.on_company_info(
+        _CompanyInfo(id=company_id, name=name, manager_name="", passworded=stored is not None)
+    )
+    core.on_client_info(_ClientInfo(id=client_id, name="Bob", company_id=company_id))
+    if stored is not None:
+        state_store.set_company_password(company_id, stored)
     messenger.reset_messages()
-    core.on_chat(make_chat(8, "!pw clear", ChatDestTypes.CLIENT))
-    assert state_store.get_company_password(4) is None
-    assert ("clear_pw", 4, None) in messenger.commands
-    expected = [
-        (8, line)
-        for line in core.messages.get_lines(
-            "password_clear_success", company_name="Firma 4"
-        )
-    ]
-    assert messenger.private_messages[-len(expected) :] == expected
+    core.on_chat(make_chat(client_id, message, dest))
+    assert state_store.get_company_password(company_id) == password
+    assert tuple(messenger.commands) == commands
+    assert tuple(messenger.private_messages) == replies
 
 
 def test_reset_and_confirm(bot):
     core, messenger, state_store = bot
-    core.on_company_info(SimpleNamespace(id=6, name="Firma 6", manager_name="", passworded=True))
-    core.on_client_info(SimpleNamespace(id=9, name="Eve", company_id=6))
+    core.on_company_info(_CompanyInfo(id=6, name="Firma 6", manager_name="", passworded=True))
+    core.on_client_info(_ClientInfo(id=9, name="Eve", company_id=6))
     messenger.reset_messages()
     core.on_chat(make_chat(9, "!reset"))
-    expected_prompt = [
-        (9, line)
-        for line in core.messages.get_lines(
-            "reset_prompt", company_name="Firma 6"
-        )
-    ]
-    assert messenger.private_messages[: len(expected_prompt)] == expected_prompt
-    core.on_client_update(SimpleNamespace(id=9, name="Eve", company_id=SPECTATOR_COMPANY_ID))
+    assert (
+        tuple(messenger.private_messages)[: len(_EXPECTED_RESET_PROMPT)]
+        == _EXPECTED_RESET_PROMPT
+    )
+    core.on_client_update(_ClientInfo(id=9, name="Eve", company_id=SPECTATOR_COMPANY_ID))
+    messenger.checkpoint()
     core.on_chat(make_chat(9, "!confirm"))
-    assert ("reset", 6, None) in messenger.commands
-    expected_confirm = [
-        (9, line)
-        for line in core.messages.get_lines(
-            "reset_confirmed", company_name="Firma 6"
-        )
-    ]
-    assert messenger.private_messages[-len(expected_confirm) :] == expected_confirm
+    assert (6, None) in messenger.commands_by_kind["reset"]
+    assert messenger.tail() == _EXPECTED_RESET_CONFIRMED
 
 
 def test_reset_confirm_requires_leaving_company(bot):
     core, messenger, _ = bot
-    core.on_company_info(SimpleNamespace(id=10, name="Firma 10", manager_name="", passworded=True))
-    core.on_client_info(SimpleNamespace(id=11, name="Fred", company_id=10))
+    core.on_company_info(_CompanyInfo(id=10, name="Firma 10", manager_name="", passworded=True))
+    core.on_client_info(_ClientInfo(id=11, name="Fred", company_id=10))
     messenger.reset_messages()
     core.on_chat(make_chat(11, "!reset"))
+    messenger.checkpoint()
     core.on_chat(make_chat(11, "!confirm"))
-    expected = [
-        (11, line)
-        for line in core.messages.get_lines(
-            "reset_still_in_company", company_name="Firma 10"
-        )
-    ]
-    assert messenger.private_messages[-len(expected) :] == expected
-    assert not any(cmd for cmd in messenger.commands if cmd[0] == "reset")
+    assert messenger.tail() == _EXPECTED_RESET_STILL_IN_COMPANY
+    assert messenger.commands_by_kind["reset"] == []
 
 
 def test_reset_confirm_cancelled_in_other_company(bot):
     core, messenger, _ = bot
-    core.on_company_info(SimpleNamespace(id=20, name="Firma 20", manager_name="", passworded=True))
-    core.on_company_info(SimpleNamespace(id=21, name="Firma 21", manager_name="", passworded=True))
-    core.on_client_info(SimpleNamespace(id=12, name="Gina", company_id=20))
+    core.on_company_info(_CompanyInfo(id=20, name="Firma 20", manager_name="", passworded=True))
+    core.on_company_info(_CompanyInfo(id=21, name="Firma 21", manager_name="", passworded=True))
+    core.on_client_info(_ClientInfo(id=12, name="Gina", company_id=20))
     messenger.reset_messages()
     core.on_chat(make_chat(12, "!reset"))
-    core.on_client_update(SimpleNamespace(id=12, name="Gina", company_id=21))
+    core.on_client_update(_ClientInfo(id=12, name="Gina", company_id=21))
+    messenger.checkpoint()
     core.on_chat(make_chat(12, "!confirm"))
-    expected = [
-        (12, line)
-        for line in core.messages.get_lines(
-            "reset_wrong_company", company_name="Firma 20"
-        )
-    ]
-    assert messenger.private_messages[-len(expected) :] == expected
-    assert not any(cmd for cmd in messenger.commands if cmd[0] == "reset")
+    assert messenger.tail() == _EXPECTED_RESET_WRONG_COMPANY
+    assert messenger.commands_by_kind["reset"] == []
 
 
 def test_reapply_password_on_company_info(bot):
     core, messenger, state_store = bot
     state_store.set_company_password(12, "schutz")
-    core.on_client_info(SimpleNamespace(id=13, name="Gina", company_id=12))
+    core.on_client_info(_ClientInfo(id=13, name="Gina", company_id=12))
     messenger.reset_messages()
-    core.on_company_info(SimpleNamespace(id=12, name="Firma 12", manager_name="", passworded=False))
-    assert ("set_pw", 12, "schutz") in messenger.commands
-    expected = [
-        (13, line)
-        for line in core.messages.get_lines(
-            "company_password_reapplied", company_name="Firma 12"
-        )
-    ]
-    assert messenger.private_messages[-len(expected) :] == expected
+    core.on_company_info(_CompanyInfo(id=12, name="Firma 12", manager_name="", passworded=False))
+    assert (12, "schutz") in messenger.commands_by_kind["set_pw"]
+    assert messenger.tail() == _EXPECTED_PASSWORD_REAPPLIED
+
+
+def test_reapply_notifies_only_current_members(bot):
+    core, messenger, state_store = bot
+    state_store.set_company_password(12, "schutz")
+    core.on_client_info(_ClientInfo(id=13, name="Gina", company_id=12))
+    core.on_client_info(_ClientInfo(id=14, name="Hans", company_id=12))
+    core.on_client_update(_ClientInfo(id=14, name="Hans", company_id=SPECTATOR_COMPANY_ID))
+    core.on_client_info(_ClientInfo(id=15, name="Ida", company_id=12))
+    core.on_client_quit(_ClientQuit(id=15))
+    messenger.reset_messages()
+
+    core.reapply_stored_passwords()
+
+    assert {client_id for client_id, _ in messenger.private_messages} == {13}
+
+
+def test_reset_session_forgets_clients_and_companies(bot):
+    core, messenger, state_store = bot
+    state_store.set_company_password(2, "alt")
+    core.on_company_info(_CompanyInfo(id=2, name="Firma 2", manager_name="", passworded=True))
+    core.on_client_info(_ClientInfo(id=7, name="Jana", company_id=2))
+
+    core.reset_session()
+    messenger.reset_messages()
+    core.reapply_stored_passwords()
+
+    assert core.clients == {}
+    assert core.companies == {}
+    assert list(messenger.commands) == [("set_pw", 2, "alt")]
+    assert list(messenger.private_messages) == []
+
+
+def test_reapply_after_password_set_and_cooldown(bot, monkeypatch):
+    core, messenger, _ = bot
+    clock = [10_000_000_000]
+    monkeypatch.setattr("openttd_bot.core.time.monotonic_ns", lambda: clock[0])
+    core.on_company_info(_CompanyInfo(id=3, name="Firma 3", manager_name="", passworded=False))
+    core.on_client_info(_ClientInfo(id=5, name="Bob", company_id=3))
+    core.on_chat(make_chat(5, "!pw geheim", ChatDestTypes.CLIENT))
+    messenger.reset_messages()
+
+    core.on_company_update(_CompanyUpdate(id=3, name="Firma 3", passworded=False))
+    assert list(messenger.commands) == []
+
+    clock[0] += 3_000_000_000
+    core.on_company_update(_CompanyUpdate(id=3, name="Firma 3", passworded=False))
+    assert list(messenger.commands) == [("set_pw", 3, "geheim")]
 
 
 def test_reapply_all_passwords(bot):
@@ -269,49 +483,37 @@ def test_reapply_all_passwords(bot):
     state_store.set_company_password(20, "eins")
     state_store.set_company_password(21, "zwei")
     core.reapply_stored_passwords()
-    assert ("set_pw", 20, "eins") in messenger.commands
-    assert ("set_pw", 21, "zwei") in messenger.commands
+    assert (20, "eins") in messenger.commands_by_kind["set_pw"]
+    assert (21, "zwei") in messenger.commands_by_kind["set_pw"]
 
 
 def test_newgame_requires_password(bot):
     core, messenger, _ = bot
-    core.on_client_info(SimpleNamespace(id=30, name="Admin", company_id=SPECTATOR_COMPANY_ID))
+    core.on_client_info(_ClientInfo(id=30, name="Admin", company_id=SPECTATOR_COMPANY_ID))
 
     messenger.reset_messages()
     core.on_chat(make_chat(30, "!newgame", ChatDestTypes.CLIENT))
-    expected_missing = [
-        (30, line)
-        for line in core.messages.get_lines("newgame_missing_password")
-    ]
-    assert messenger.private_messages == expected_missing
-    assert messenger.commands == []
+    assert tuple(messenger.private_messages) == _EXPECTED_NEWGAME_MISSING
+    assert list(messenger.commands) == []
 
     messenger.reset_messages()
     core.on_chat(make_chat(30, "!newgame falsch", ChatDestTypes.CLIENT))
-    expected_invalid = [
-        (30, line)
-        for line in core.messages.get_lines("newgame_invalid_password")
-    ]
-    assert messenger.private_messages == expected_invalid
-    assert messenger.commands == []
+    assert tuple(messenger.private_messages) == _EXPECTED_NEWGAME_INVALID
+    assert list(messenger.commands) == []
 
 
 def test_newgame_clears_passwords_and_restarts(bot):
     core, messenger, state_store = bot
-    core.on_company_info(SimpleNamespace(id=0, name="Firma 1", manager_name="", passworded=True))
-    core.on_company_info(SimpleNamespace(id=1, name="Firma 2", manager_name="", passworded=True))
+    core.on_company_info(_CompanyInfo(id=0, name="Firma 1", manager_name="", passworded=True))
+    core.on_company_info(_CompanyInfo(id=1, name="Firma 2", manager_name="", passworded=True))
     state_store.set_company_password(0, "secret")
-    core.on_client_info(SimpleNamespace(id=31, name="Admin", company_id=SPECTATOR_COMPANY_ID))
+    core.on_client_info(_ClientInfo(id=31, name="Admin", company_id=SPECTATOR_COMPANY_ID))
 
     messenger.reset_messages()
     core.on_chat(make_chat(31, "!newgame admin", ChatDestTypes.CLIENT))
 
-    assert ("clear_pw", 0, None) in messenger.commands
-    assert ("clear_pw", 1, None) in messenger.commands
-    assert ("restart", None, None) in messenger.commands
+    assert (0, None) in messenger.commands_by_kind["clear_pw"]
+    assert (1, None) in messenger.commands_by_kind["clear_pw"]
+    assert messenger.commands_by_kind["restart"] == [(None, None)]
     assert list(state_store.iter_company_passwords()) == []
-    expected_started = [
-        (31, line)
-        for line in core.messages.get_lines("newgame_started")
-    ]
-    assert messenger.private_messages[-len(expected_started) :] == expected_started
+    assert messenger.tail() == _EXPECTED_NEWGAME_STARTED
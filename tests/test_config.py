@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import pytest
+
+from openttd_bot.config import BotConfig
+
+
+@pytest.fixture(autouse=True)
+def reset_config_cache():
+    BotConfig.reset_cache()
+    yield
+    BotConfig.reset_cache()
+
+
+def test_from_env_is_cached_until_reset(monkeypatch, tmp_path) -> None:
+    monkeypatch.setenv("OTTD_ADMIN_PASSWORD", "secret")
+    monkeypatch.setenv("STATE_FILE", str(tmp_path / "state.json"))
+    first = BotConfig.from_env()
+
+    monkeypatch.setenv("BOT_NAME", "OtherBot")
+    assert BotConfig.from_env() is first
+
+    BotConfig.reset_cache()
+    reloaded = BotConfig.from_env()
+    assert reloaded.bot_name == "OtherBot"
+    assert reloaded.state_file == (tmp_path / "state.json").resolve()
+
+
+def test_from_env_requires_admin_password(monkeypatch) -> None:
+    monkeypatch.delenv("OTTD_ADMIN_PASSWORD", raising=False)
+    with pytest.raises(ValueError):
+        BotConfig.from_env()
@@ -1,15 +1,25 @@
 from __future__ import annotations
 
+from pyopenttdadmin.enums import AdminUpdateFrequency, AdminUpdateType
+
 from openttd_bot.messenger import AdminMessenger
 
 
 class DummyAdmin:
     def __init__(self) -> None:
         self.rcon_commands: list[str] = []
+        self.private_messages: list[tuple[int, str]] = []
+        self.subscriptions: list[tuple[object, object]] = []
 
     def send_rcon(self, command: str) -> None:  # pragma: no cover - simple stub
         self.rcon_commands.append(command)
 
+    def send_private(self, message: str, client_id: int) -> None:  # pragma: no cover - simple stub
+        self.private_messages.append((client_id, message))
+
+    def subscribe(self, update_type, frequency) -> None:  # pragma: no cover - simple stub
+        self.subscriptions.append((update_type, frequency))
+
 
 def test_rcon_commands_use_one_based_company_ids() -> None:
     admin = DummyAdmin()
@@ -26,3 +36,52 @@ def test_rcon_commands_use_one_based_company_ids() -> None:
         'reset_company 6',
         'restart',
     ]
+
+
+def test_send_private_lines_skips_empty_lines() -> None:
+    admin = DummyAdmin()
+    messenger = AdminMessenger(admin)  # type: ignore[arg-type]
+
+    messenger.send_private_lines(3, ["eins", "", "zwei"])
+    messenger.send_private_lines(3, [])
+
+    assert admin.private_messages == [(3, "eins"), (3, "zwei")]
+
+
+def test_rcon_arguments_are_escaped() -> None:
+    admin = DummyAdmin()
+    messenger = AdminMessenger(admin)  # type: ignore[arg-type]
+
+    messenger.set_company_password(0, 'a"b\\c')
+    messenger.set_admin_name('Bot "1"')
+
+    assert admin.rcon_commands == [
+        'company_pw 1 "a\\"b\\\\c"',
+        'name "Bot \\"1\\""',
+    ]
+
+
+def test_rebind_switches_admin() -> None:
+    first = DummyAdmin()
+    second = DummyAdmin()
+    messenger = AdminMessenger(first)  # type: ignore[arg-type]
+
+    messenger.restart_game()
+    messenger.rebind(second)  # type: ignore[arg-type]
+    messenger.restart_game()
+
+    assert first.rcon_commands == ["restart"]
+    assert second.rcon_commands == ["restart"]
+
+
+def test_subscribe_many_sends_every_subscription() -> None:
+    admin = DummyAdmin()
+    messenger = AdminMessenger(admin)  # type: ignore[arg-type]
+    subscriptions = [
+        (AdminUpdateType.CHAT, AdminUpdateFrequency.AUTOMATIC),
+        (AdminUpdateType.CLIENT_INFO, AdminUpdateFrequency.AUTOMATIC),
+    ]
+
+    messenger.subscribe_many(subscriptions)
+
+    assert admin.subscriptions == subscriptions
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from pyopenttdadmin.packet import ShutdownPacket
+
+from openttd_bot import runner
+from openttd_bot.runner import InstrumentedAdmin, _Scheduler
+
+
+def test_scheduler_runs_due_callbacks_in_order(monkeypatch) -> None:
+    now = [100.0]
+    monkeypatch.setattr(runner.time, "monotonic", lambda: now[0])
+    scheduler = _Scheduler()
+    calls: list[str] = []
+
+    scheduler.call_later(2, lambda: calls.append("late"))
+    scheduler.call_later(1, lambda: calls.append("early"))
+    cancelled = scheduler.call_later(1, lambda: calls.append("cancelled"))
+    scheduler.cancel(cancelled)
+
+    scheduler.run_due()
+    assert calls == []
+
+    now[0] = 101.0
+    scheduler.run_due()
+    assert calls == ["early"]
+
+    now[0] = 105.0
+    scheduler.run_due()
+    assert calls == ["early", "late"]
+
+
+def test_handle_packet_uses_dispatch_table_and_handlers() -> None:
+    class FakePacket:
+        pass
+
+    admin = InstrumentedAdmin.__new__(InstrumentedAdmin)
+    calls: list[str] = []
+    admin.dispatch = {FakePacket: lambda packet: calls.append("dispatch")}
+    admin.handlers = {FakePacket: [lambda _admin, packet: calls.append("handler")]}
+
+    admin.handle_packet(FakePacket())
+    admin.handle_packet(object())
+    assert calls == ["dispatch", "handler"]
+
+
+def test_serve_survives_handler_errors() -> None:
+    class BrokenPacket:
+        pass
+
+    class FakeAdmin:
+        def __init__(self) -> None:
+            self.batches = [[BrokenPacket()], [ShutdownPacket(b"")]]
+            self.handled: list[str] = []
+
+        def recv(self) -> list:
+            return self.batches.pop(0)
+
+        def on_packet(self, packet) -> None:
+            self.handled.append(type(packet).__name__)
+            if isinstance(packet, BrokenPacket):
+                raise RuntimeError("boom")
+
+    admin = FakeAdmin()
+    bot_runner = runner.BotRunner.__new__(runner.BotRunner)
+    bot_runner._scheduler = _Scheduler()
+
+    bot_runner._serve(admin)  # type: ignore[arg-type]
+
+    assert admin.handled == ["BrokenPacket", "ShutdownPacket"]
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import gc
+import json
+import time
+import weakref
+
+from openttd_bot.state import StateStore
+
+
+def read_companies(path) -> dict[str, str]:
+    with path.open("r", encoding="utf-8") as handle:
+        return json.load(handle)["companies"]
+
+
+def test_writes_are_coalesced_until_flush(tmp_path) -> None:
+    path = tmp_path / "state.json"
+    store = StateStore(path, flush_delay_seconds=60)
+
+    store.set_company_password(0, "eins")
+    store.set_company_password(1, "zwei")
+    store.clear_company_password(0)
+    assert not path.exists()
+
+    store.close()
+    assert read_companies(path) == {"1": "zwei"}
+
+
+def test_zero_delay_writes_immediately(tmp_path) -> None:
+    path = tmp_path / "state.json"
+    store = StateStore(path, flush_delay_seconds=0)
+
+    store.set_company_password(3, "geheim")
+    assert read_companies(path) == {"3": "geheim"}
+
+    reloaded = StateStore(path, flush_delay_seconds=0)
+    assert reloaded.get_company_password(3) == "geheim"
+    store.close()
+    reloaded.close()
+
+
+def test_has_company_passwords_tracks_contents(tmp_path) -> None:
+    store = StateStore(tmp_path / "state.json", flush_delay_seconds=0)
+    assert not store.has_company_passwords()
+
+    store.set_company_password(2, "drei")
+    assert store.has_company_passwords()
+
+    store.clear_all_company_passwords()
+    assert not store.has_company_passwords()
+    store.close()
+
+
+def test_failed_flush_is_retried(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr("openttd_bot.state._FLUSH_RETRY_SECONDS", 0.01)
+    path = tmp_path / "state.json"
+    store = StateStore(path, flush_delay_seconds=0.01)
+    write = store._write
+    failures = [OSError("disk full")]
+
+    def flaky_write(companies) -> None:
+        if failures:
+            raise failures.pop()
+        write(companies)
+
+    monkeypatch.setattr(store, "_write", flaky_write)
+    store.set_company_password(4, "vier")
+    deadline = time.monotonic() + 5
+    while not path.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert read_companies(path) == {"4": "vier"}
+    store.close()
+
+
+def test_stores_are_not_kept_alive_for_exit_flush(tmp_path) -> None:
+    store = StateStore(tmp_path / "state.json", flush_delay_seconds=0)
+    ref = weakref.ref(store)
+    del store
+    gc.collect()
+
+    assert ref() is None
+
+
+def test_close_does_not_keep_retrying_failed_writes(tmp_path, monkeypatch) -> None:
+    store = StateStore(tmp_path / "state.json", flush_delay_seconds=60)
+    attempts: list[dict[int, str]] = []
+
+    def failing_write(companies) -> None:
+        attempts.append(companies)
+        raise OSError("read-only file system")
+
+    monkeypatch.setattr(store, "_write", failing_write)
+    store.set_company_password(1, "eins")
+    store.close()
+
+    assert len(attempts) == 1
+    assert store._flush_timer is None